@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency benchmark for continuous batching
+
+Sends the same set of requests, all arriving at once, through three paths
+and reports the total time, generated tokens per second and per-request
+latency percentiles:
+
+- sequential: one pipeline call per request (the default server path)
+- static: pipeline calls over fixed batches; a batch finishes together
+- continuous: the ContinuousBatcher used by --continuous-batching
+
+Every request generates exactly its token limit (EOS is ignored) so all
+paths do the same work.
+
+Run with:
+- python benchmark_batching.py --model distilgpt2
+- python benchmark_batching.py --model distilgpt2 --random-init --mixed-lengths
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+
+import torch
+from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer, pipeline
+from transformers.utils import logging as transformers_logging
+
+from continuous_batching import ContinuousBatcher
+
+PROMPT_TEXT = ("Two students meet on campus to talk about their interests, their "
+               "courses and what they hope to do after graduating. ")
+
+def build_pipeline(model_name, random_init):
+    """Load a text-generation pipeline, optionally with randomly initialised weights"""
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if random_init:
+        torch.manual_seed(0)
+        model = AutoModelForCausalLM.from_config(AutoConfig.from_pretrained(model_name))
+    else:
+        model = AutoModelForCausalLM.from_pretrained(model_name)
+    model.eval()
+
+    # Static batches are left-padded so every prompt ends at the same position
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = 'left'
+    return pipeline('text-generation', model=model, tokenizer=tokenizer)
+
+def build_requests(tokenizer, count, prompt_tokens, new_tokens, mixed_lengths):
+    """Return (prompt, max_new_tokens) pairs with prompts of about prompt_tokens tokens"""
+    rng = random.Random(0)
+    requests = []
+    for i in range(count):
+        text = f"Request {i}. " + PROMPT_TEXT * (prompt_tokens // 4 + 1)
+        prompt = tokenizer.decode(tokenizer.encode(text)[:prompt_tokens])
+        limit = rng.randint(max(1, new_tokens // 8), new_tokens) if mixed_lengths else new_tokens
+        requests.append((prompt, limit))
+    return requests
+
+def run_sequential(pipe, requests):
+    """Generate one request at a time; return per-request completion times"""
+    start = time.perf_counter()
+    latencies = []
+    for prompt, limit in requests:
+        pipe(prompt, max_new_tokens=limit, min_new_tokens=limit, do_sample=True,
+             temperature=0.7, top_p=0.9)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def run_static(pipe, requests, batch_size):
+    """Generate fixed batches; every request in a batch completes with its longest member"""
+    start = time.perf_counter()
+    latencies = []
+    for i in range(0, len(requests), batch_size):
+        batch = requests[i:i + batch_size]
+        limit = max(limit for _, limit in batch)
+        pipe([prompt for prompt, _ in batch], batch_size=len(batch), max_new_tokens=limit,
+             min_new_tokens=limit, do_sample=True, temperature=0.7, top_p=0.9)
+        latencies.extend([time.perf_counter() - start] * len(batch))
+    return latencies
+
+def run_continuous(pipe, requests, batch_size):
+    """Submit every request to a continuous batcher at once"""
+    batcher = ContinuousBatcher(pipe, max_batch_size=batch_size)
+    batcher.eos_token_id = None  # Generate every request up to its limit
+
+    # Warm up the scheduler thread so its start-up is not measured
+    batcher.generate(requests[0][0], max_new_tokens=1)
+
+    start = time.perf_counter()
+    latencies = [0.0] * len(requests)
+    futures = []
+    for i, (prompt, limit) in enumerate(requests):
+        future = batcher.submit(prompt, max_new_tokens=limit, temperature=0.7, top_p=0.9)
+        future.add_done_callback(
+            lambda _, i=i: latencies.__setitem__(i, time.perf_counter() - start))
+        futures.append(future)
+    for future in futures:
+        future.result()
+    batcher.stop()
+    return latencies
+
+def percentile(values, fraction):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def report(name, latencies, tokens):
+    """Print one result row"""
+    total = max(latencies)
+    print(f"{name:<12} {total:8.2f}s {tokens / total:10.1f} "
+          f"{percentile(latencies, 0.5):8.2f}s {percentile(latencies, 0.95):8.2f}s")
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description='Benchmark continuous batching against the pipeline')
+    parser.add_argument('--model', type=str, default='distilgpt2', help='Model name or path')
+    parser.add_argument('--random-init', action='store_true',
+                        help='Use randomly initialised weights (only the config and tokenizer are loaded)')
+    parser.add_argument('--requests', type=int, default=8, help='Number of requests')
+    parser.add_argument('--prompt-tokens', type=int, default=450, help='Prompt length in tokens')
+    parser.add_argument('--new-tokens', type=int, default=40, help='Tokens generated per request')
+    parser.add_argument('--mixed-lengths', action='store_true',
+                        help='Draw each request\'s token limit between new-tokens/8 and new-tokens')
+    parser.add_argument('--batch-size', type=int, default=8, help='Batch size for static and continuous')
+    parser.add_argument('--modes', type=str, default='sequential,static,continuous',
+                        help='Comma-separated paths to run')
+    args = parser.parse_args()
+
+    # Generation config notices would be repeated for every pipeline call
+    transformers_logging.set_verbosity_error()
+    pipe = build_pipeline(args.model, args.random_init)
+    requests = build_requests(pipe.tokenizer, args.requests, args.prompt_tokens,
+                              args.new_tokens, args.mixed_lengths)
+    tokens = sum(limit for _, limit in requests)
+
+    # Warm up kernels and allocator before timing
+    pipe(requests[0][0], max_new_tokens=2, do_sample=False)
+
+    print(f"{args.model}: {args.requests} requests x {args.prompt_tokens} prompt tokens, "
+          f"{tokens} new tokens in total, batch size {args.batch_size}")
+    print(f"{'path':<12} {'total':>9} {'tokens/s':>10} {'p50':>9} {'p95':>9}")
+
+    runs = {
+        'sequential': lambda: run_sequential(pipe, requests),
+        'static': lambda: run_static(pipe, requests, args.batch_size),
+        'continuous': lambda: run_continuous(pipe, requests, args.batch_size)
+    }
+    for mode in args.modes.split(','):
+        if mode not in runs:
+            print(f"❌ Unknown mode: {mode}")
+            return False
+        report(mode, runs[mode](), tokens)
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    if not success:
+        sys.exit(1)
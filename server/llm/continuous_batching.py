@@ -0,0 +1,395 @@
+"""
+Continuous (iteration-level) batching for causal language models
+
+A single scheduler thread owns the model. At every decode step it admits
+queued requests into free batch slots, runs one forward pass for all active
+sequences, samples one token per sequence, and retires sequences that hit
+EOS or their token limit. A short request therefore never waits for the
+longest member of its batch.
+
+Keys and values live in preallocated per-layer buffers with one row per
+batch slot. Active sequences occupy the first rows. A decode step writes
+each sequence's new key and value at that sequence's own position and lets
+the model attend over a view of the buffers; the unused tail of shorter
+rows is masked out. Nothing is padded, concatenated or split per step.
+Requests admitted at the same step boundary share one prefill pass. Each
+request samples with its own torch.Generator, so a seeded request produces
+the same tokens whatever else is in the batch.
+"""
+
+import inspect
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+import torch
+from transformers import DynamicCache
+
+logger = logging.getLogger("icebreaker-generator")
+
+# Scheduler defaults
+DEFAULT_MAX_BATCH_SIZE = 8  # Sequences decoded together per step
+DEFAULT_TOP_K = 50  # Matches the transformers generation default
+MIN_CACHE_COLUMNS = 256  # Initial positions per slot; grows by doubling
+
+class BatcherStopped(RuntimeError):
+    """Raised for requests submitted to, or still queued in, a stopped batcher"""
+
+def sample_token(logits: torch.Tensor, temperature: float, top_p: float,
+                 generator: torch.Generator, top_k: int = DEFAULT_TOP_K) -> int:
+    """Sample one token id with temperature, top-k and nucleus filtering"""
+    logits = logits.float() / max(temperature, 1e-5)
+    if top_k and top_k < logits.shape[-1]:
+        threshold = torch.topk(logits, top_k).values[-1]
+        logits = logits.masked_fill(logits < threshold, float('-inf'))
+
+    probs = torch.softmax(logits, dim=-1)
+    sorted_probs, sorted_ids = torch.sort(probs, descending=True)
+    # Keep the smallest prefix whose mass reaches top_p (always at least one token)
+    outside_nucleus = torch.cumsum(sorted_probs, dim=-1) - sorted_probs > top_p
+    sorted_probs = sorted_probs.masked_fill(outside_nucleus, 0.0)
+    choice = torch.multinomial(sorted_probs, 1, generator=generator)
+    return int(sorted_ids[choice].item())
+
+class _SlotBuffers:
+    """Per-layer key and value buffers of shape [slots, heads, capacity, head_dim]"""
+
+    def __init__(self, slots: int, max_columns: Optional[int]):
+        self.slots = slots
+        self.max_columns = max_columns
+        self.capacity = 0
+        self.keys: List[torch.Tensor] = []
+        self.values: List[torch.Tensor] = []
+
+    def reserve(self, columns: int):
+        """Make room for columns positions per slot, doubling the capacity as needed"""
+        if columns <= self.capacity:
+            return
+        capacity = max(columns, 2 * self.capacity, MIN_CACHE_COLUMNS)
+        if self.max_columns:
+            capacity = max(columns, min(capacity, self.max_columns))
+        for layer in range(len(self.keys)):
+            self.keys[layer] = self._grow(self.keys[layer], capacity)
+            self.values[layer] = self._grow(self.values[layer], capacity)
+        self.capacity = capacity
+
+    @staticmethod
+    def _grow(buffer: torch.Tensor, capacity: int) -> torch.Tensor:
+        grown = buffer.new_zeros(buffer.shape[0], buffer.shape[1], capacity, buffer.shape[3])
+        grown[:, :, :buffer.shape[2]] = buffer
+        return grown
+
+    def layer(self, index: int, like: torch.Tensor):
+        """Return the buffers of a layer, allocating them on first use"""
+        while len(self.keys) <= index:
+            shape = (self.slots, like.shape[1], self.capacity, like.shape[3])
+            self.keys.append(like.new_zeros(shape))
+            self.values.append(like.new_zeros(shape))
+        return self.keys[index], self.values[index]
+
+    def move(self, source: int, target: int, length: int):
+        """Copy the first length positions of one slot into another"""
+        for keys, values in zip(self.keys, self.values):
+            keys[target, :, :length] = keys[source, :, :length]
+            values[target, :, :length] = values[source, :, :length]
+
+    def clear(self):
+        """Release the buffers"""
+        self.keys = []
+        self.values = []
+        self.capacity = 0
+
+class _SlotCache(DynamicCache):
+    """Cache passed to the model for one forward pass over slots start..stop-1
+
+    update() writes row i's new keys and values at columns positions[i] of its
+    slot and returns views of the buffers, so the model attends over the
+    slots in place instead of concatenating a new cache.
+    """
+
+    def __init__(self, buffers: _SlotBuffers, start: int, stop: int,
+                 positions: torch.Tensor, past_length: int):
+        super().__init__()
+        self.buffers = buffers
+        self.start = start
+        self.stop = stop
+        self.positions = positions  # [rows, new tokens] columns written per row
+        self.past_length = past_length  # Columns visible before this pass
+        self._rows = torch.arange(stop - start, device=positions.device)[:, None]
+
+    def update(self, key_states: torch.Tensor, value_states: torch.Tensor,
+               layer_idx: int, *args, **kwargs):
+        keys, values = self.buffers.layer(layer_idx, key_states)
+        keys = keys[self.start:self.stop]
+        values = values[self.start:self.stop]
+        # Indexing rows and columns around the head dimension puts those dimensions first
+        keys[self._rows, :, self.positions] = key_states.transpose(1, 2)
+        values[self._rows, :, self.positions] = value_states.transpose(1, 2)
+
+        width = self.past_length + key_states.shape[-2]
+        return keys[:, :, :width], values[:, :, :width]
+
+    def get_seq_length(self, layer_idx: int = 0) -> int:
+        return self.past_length
+
+    def get_mask_sizes(self, query, layer_idx: int = 0):
+        # Older transformers releases pass the cache positions instead of the query length
+        query_length = query if isinstance(query, int) else query.shape[0]
+        return self.past_length + query_length, 0
+
+class _Sequence:
+    """One request occupying a batch slot"""
+
+    def __init__(self, prompt: str, prompt_ids: List[int], max_new_tokens: int,
+                 temperature: float, top_p: float, generator: torch.Generator, future: Future):
+        self.prompt = prompt
+        self.prompt_ids = prompt_ids
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.top_p = top_p
+        self.generator = generator
+        self.future = future
+
+        self.length = 0  # Positions held in the slot's cache
+        self.generated: List[int] = []
+        self.finished = False
+
+class ContinuousBatcher:
+    """Serve generation requests for one model with iteration-level scheduling"""
+
+    def __init__(self, pipe, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE):
+        """Start a scheduler thread for the model and tokenizer of a text-generation pipeline"""
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+
+        self.pipe = pipe
+        self.model = pipe.model
+        self.tokenizer = pipe.tokenizer
+        self.device = self.model.device
+        self.max_batch_size = max_batch_size
+        self.max_positions = getattr(self.model.config, 'n_positions', None) or \
+            getattr(self.model.config, 'max_position_embeddings', None)
+        self.eos_token_id = self.tokenizer.eos_token_id
+        # Prefill only needs the logits at each prompt's last position
+        self._keep_logits = 'logits_to_keep' in inspect.signature(self.model.forward).parameters
+
+        self.generated_tokens = 0
+        self.completed = 0
+        self._started_at = time.monotonic()
+
+        self._buffers = _SlotBuffers(max_batch_size, self.max_positions)
+        self._pending: "queue.Queue[_Sequence]" = queue.Queue()
+        self._active: List[_Sequence] = []  # Sequence i occupies slot i
+        # Held while submitting and while the scheduler decides to exit, so a
+        # request can never be queued after the scheduler's last look at the queue
+        self._admission_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="continuous-batcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def stopped(self) -> bool:
+        """Whether the batcher refuses new requests"""
+        return self._stopping.is_set()
+
+    @property
+    def thread_id(self) -> Optional[int]:
+        """Identifier of the scheduler thread, which runs all model calls"""
+        return self._thread.ident
+
+    def submit(self, prompt: str, max_new_tokens: int = 150, temperature: float = 0.7,
+               top_p: float = 0.9, seed: Optional[int] = None) -> Future:
+        """Queue a prompt; the future resolves to the prompt followed by the generated text"""
+        prompt_ids = self.tokenizer.encode(prompt)
+        if self.max_positions:
+            # Leave room for at least one generated token
+            prompt_ids = prompt_ids[-(self.max_positions - 1):]
+            max_new_tokens = max(1, min(max_new_tokens, self.max_positions - len(prompt_ids)))
+
+        generator = torch.Generator(device=self.device)
+        if seed is not None:
+            generator.manual_seed(seed)
+        else:
+            generator.seed()
+
+        future: Future = Future()
+        sequence = _Sequence(prompt, prompt_ids, max_new_tokens, temperature, top_p, generator, future)
+        with self._admission_lock:
+            if self._stopping.is_set():
+                raise BatcherStopped("Batcher is stopped")
+            self._pending.put(sequence)
+        return future
+
+    def generate(self, prompt: str, max_new_tokens: int = 150, temperature: float = 0.7,
+                 top_p: float = 0.9, seed: Optional[int] = None) -> str:
+        """Generate text for a prompt, blocking until its sequence finishes"""
+        return self.submit(prompt, max_new_tokens, temperature, top_p, seed).result()
+
+    def stop(self):
+        """Finish the sequences already queued or running, then stop the scheduler"""
+        self._stopping.set()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the scheduler thread to exit after stop(); return whether it has"""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def stats(self) -> Dict[str, Any]:
+        """Describe current load and throughput"""
+        elapsed = time.monotonic() - self._started_at
+        return {
+            "active": len(self._active),
+            "queued": self._pending.qsize(),
+            "maxBatchSize": self.max_batch_size,
+            "completed": self.completed,
+            "generatedTokens": self.generated_tokens,
+            "tokensPerSecond": round(self.generated_tokens / elapsed, 2) if elapsed > 0 else 0.0
+        }
+
+    def _run(self):
+        """Scheduler loop: admit, step, retire"""
+        try:
+            while True:
+                admitted: List[_Sequence] = []
+                if not self._active:
+                    with self._admission_lock:
+                        if self._stopping.is_set() and self._pending.empty():
+                            return
+                    try:
+                        admitted.append(self._pending.get(timeout=0.5))
+                    except queue.Empty:
+                        continue
+
+                # New requests join at every step boundary while there is room
+                while len(self._active) + len(admitted) < self.max_batch_size:
+                    try:
+                        admitted.append(self._pending.get_nowait())
+                    except queue.Empty:
+                        break
+
+                try:
+                    # The slot buffers are inference tensors, so all updates happen in this mode
+                    with torch.inference_mode():
+                        if admitted:
+                            self._admit(admitted)
+                        self._retire()
+                        if self._active:
+                            self._step()
+                            self._retire()
+                except Exception as e:
+                    # Only the sequences in this step are affected; queued ones
+                    # are admitted on the next iteration
+                    logger.error(f"Error in continuous batching step: {e}")
+                    self._fail(self._active + admitted, e)
+                    self._active = []
+        finally:
+            with self._admission_lock:
+                self._stopping.set()
+            self._fail(self._active + self._drain(), BatcherStopped("Batcher is stopped"))
+            self._active = []
+            self._buffers.clear()
+
+    def _drain(self) -> List[_Sequence]:
+        """Remove and return every queued sequence"""
+        sequences = []
+        while True:
+            try:
+                sequences.append(self._pending.get_nowait())
+            except queue.Empty:
+                return sequences
+
+    @staticmethod
+    def _fail(sequences: List[_Sequence], error: BaseException):
+        """Resolve the futures of unfinished sequences with an error"""
+        for sequence in sequences:
+            if not sequence.future.done():
+                sequence.future.set_exception(error)
+
+    def _admit(self, sequences: List[_Sequence]):
+        """Prefill newly admitted prompts in one pass and sample their first tokens"""
+        sequences = [sequence for sequence in sequences
+                     if sequence.future.set_running_or_notify_cancel()]
+        if not sequences:
+            return
+
+        start = len(self._active)
+        lengths = [len(sequence.prompt_ids) for sequence in sequences]
+        longest = max(lengths)
+        self._buffers.reserve(longest)
+
+        # Right padding keeps every prompt at positions 0..length-1 of its slot;
+        # the padding's keys land past the prompt, masked until overwritten
+        input_ids = torch.zeros((len(sequences), longest), dtype=torch.long, device=self.device)
+        attention_mask = torch.zeros_like(input_ids)
+        for i, sequence in enumerate(sequences):
+            input_ids[i, :lengths[i]] = torch.tensor(sequence.prompt_ids, device=self.device)
+            attention_mask[i, :lengths[i]] = 1
+        positions = torch.arange(longest, device=self.device).expand(len(sequences), longest)
+
+        last = [length - 1 for length in lengths]
+        kwargs = {}
+        if self._keep_logits:
+            keep = sorted(set(last))
+            kwargs['logits_to_keep'] = torch.tensor(keep, device=self.device)
+            last = [keep.index(index) for index in last]
+
+        cache = _SlotCache(self._buffers, start, start + len(sequences), positions, 0)
+        output = self.model(input_ids=input_ids, attention_mask=attention_mask,
+                            position_ids=positions, past_key_values=cache,
+                            use_cache=True, **kwargs)
+
+        for i, sequence in enumerate(sequences):
+            sequence.length = lengths[i]
+            self._append_token(sequence, output.logits[i, last[i]])
+            self._active.append(sequence)
+
+    def _step(self):
+        """Decode one token for every active sequence in a single forward pass"""
+        batch = self._active
+        lengths = torch.tensor([[sequence.length] for sequence in batch], device=self.device)
+        width = max(sequence.length for sequence in batch) + 1
+        self._buffers.reserve(width)
+
+        input_ids = torch.tensor([[sequence.generated[-1]] for sequence in batch],
+                                 device=self.device)
+        # Each row sees its own positions plus the new token; the stale tail of
+        # shorter rows stays masked
+        attention_mask = (torch.arange(width, device=self.device) <= lengths).long()
+
+        cache = _SlotCache(self._buffers, 0, len(batch), lengths, width - 1)
+        output = self.model(input_ids=input_ids, attention_mask=attention_mask,
+                            position_ids=lengths, past_key_values=cache, use_cache=True)
+
+        for i, sequence in enumerate(batch):
+            sequence.length += 1
+            self._append_token(sequence, output.logits[i, -1])
+
+    def _append_token(self, sequence: _Sequence, logits: torch.Tensor):
+        """Sample the next token of a sequence and mark it finished when done"""
+        token = sample_token(logits, sequence.temperature, sequence.top_p, sequence.generator)
+        sequence.generated.append(token)
+        self.generated_tokens += 1
+        if token == self.eos_token_id or len(sequence.generated) >= sequence.max_new_tokens:
+            sequence.finished = True
+
+    def _retire(self):
+        """Resolve finished sequences and move the others down to fill the freed slots"""
+        still_active = []
+        for slot, sequence in enumerate(self._active):
+            if not sequence.finished:
+                if slot != len(still_active):
+                    self._buffers.move(slot, len(still_active), sequence.length)
+                still_active.append(sequence)
+                continue
+
+            self.completed += 1
+            try:
+                text = self.tokenizer.decode(sequence.generated, skip_special_tokens=True)
+                sequence.future.set_result(sequence.prompt + text)
+            except Exception as e:
+                logger.error(f"Error decoding sequence: {e}")
+                sequence.future.set_exception(e)
+        self._active = still_active
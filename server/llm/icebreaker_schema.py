@@ -0,0 +1,215 @@
+"""
+Request schema and JSON helpers shared by the icebreaker servers
+
+Incoming payloads are decoded and validated in one pass into an
+IcebreakerRequest before any prompt construction or tokenization happens.
+Oversized bodies, long lists and long strings are rejected up front.
+install_json_errors() makes a Flask app answer those rejections with JSON.
+
+orjson is used for decoding and encoding when it is installed
+(pip install orjson), with the standard library json module as fallback.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Request limits
+MAX_BODY_BYTES = 16 * 1024  # Largest accepted request body
+MAX_LIST_ITEMS = 20  # Longest interests/languages/goals list
+MAX_STRING_LENGTH = 200  # Longest individual string value
+
+# Seeds are passed to torch.manual_seed and numpy, so keep them within 32 bits
+MAX_SEED = 2**32 - 1
+
+PROFILE_STRING_FIELDS = ('name', 'campus', 'personality')
+PROFILE_LIST_FIELDS = ('interests', 'languages', 'goals')
+
+class ValidationError(ValueError):
+    """Raised when a request payload does not match the schema"""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__("; ".join(errors))
+
+def loads(data: bytes) -> Any:
+    """Decode JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj: Any) -> bytes:
+    """Encode an object as compact UTF-8 JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def json_response(obj: Any, status: int = 200, headers: Optional[Dict[str, str]] = None):
+    """Build a Flask response encoded with the fast JSON encoder"""
+    from flask import Response
+    return Response(dumps(obj), status=status, mimetype='application/json', headers=headers)
+
+def install_json_errors(app):
+    """Limit request bodies and report oversized or invalid requests as JSON
+
+    Handlers can then call IcebreakerRequest.from_json() without catching
+    ValidationError themselves.
+    """
+    app.config['MAX_CONTENT_LENGTH'] = MAX_BODY_BYTES
+
+    @app.errorhandler(413)
+    def request_too_large(e):
+        return json_response({"error": f"Request body must be at most {MAX_BODY_BYTES} bytes"}, 413)
+
+    @app.errorhandler(ValidationError)
+    def invalid_request(e):
+        return json_response({"error": "Invalid request", "details": e.errors}, 400)
+
+def _check_string(value: Any, path: str, errors: List[str]) -> Optional[str]:
+    """Validate an optional string value"""
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        errors.append(f"{path} must be a string")
+        return None
+    if len(value) > MAX_STRING_LENGTH:
+        errors.append(f"{path} must be at most {MAX_STRING_LENGTH} characters")
+        return None
+    return value
+
+def _check_string_list(value: Any, path: str, errors: List[str]) -> Optional[List[str]]:
+    """Validate an optional list of strings"""
+    if value is None:
+        return None
+    if not isinstance(value, list):
+        errors.append(f"{path} must be a list of strings")
+        return None
+    if len(value) > MAX_LIST_ITEMS:
+        errors.append(f"{path} must have at most {MAX_LIST_ITEMS} items")
+        return None
+
+    items = []
+    for i, item in enumerate(value):
+        checked = _check_string(item, f"{path}[{i}]", errors)
+        if item is None:
+            errors.append(f"{path}[{i}] must be a string")
+        elif checked is not None:
+            items.append(checked)
+    return items
+
+@dataclass
+class UserProfile:
+    """Profile of one student in the meetup"""
+    name: Optional[str] = None
+    campus: Optional[str] = None
+    personality: Optional[str] = None
+    interests: Optional[List[str]] = None
+    languages: Optional[List[str]] = None
+    goals: Optional[List[str]] = None
+
+    @classmethod
+    def from_dict(cls, value: Any, path: str, errors: List[str]) -> 'UserProfile':
+        """Validate a profile object, collecting problems in errors"""
+        if value is None:
+            return cls()
+        if not isinstance(value, dict):
+            errors.append(f"{path} must be an object")
+            return cls()
+
+        # Unknown profile fields are ignored rather than rejected
+        kwargs = {}
+        for key in PROFILE_STRING_FIELDS:
+            kwargs[key] = _check_string(value.get(key), f"{path}.{key}", errors)
+        for key in PROFILE_LIST_FIELDS:
+            kwargs[key] = _check_string_list(value.get(key), f"{path}.{key}", errors)
+        return cls(**kwargs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the provided fields only, so callers can apply their own defaults"""
+        values = {key: getattr(self, key) for key in PROFILE_STRING_FIELDS + PROFILE_LIST_FIELDS}
+        return {key: value for key, value in values.items() if value is not None}
+
+@dataclass
+class IcebreakerRequest:
+    """Validated body of an /api/icebreakers request"""
+    user_a: UserProfile = field(default_factory=UserProfile)
+    user_b: UserProfile = field(default_factory=UserProfile)
+    meeting_date: Optional[str] = None
+    location: Optional[str] = None
+    model: Optional[str] = None
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_json(cls, body: bytes) -> 'IcebreakerRequest':
+        """Decode and validate a raw request body"""
+        if not body:
+            raise ValidationError(["No data provided"])
+        if len(body) > MAX_BODY_BYTES:
+            raise ValidationError([f"Request body must be at most {MAX_BODY_BYTES} bytes"])
+
+        try:
+            data = loads(body)
+        except ValueError as e:
+            raise ValidationError([f"Invalid JSON: {e}"])
+        except RecursionError:
+            # The stdlib decoder recurses per nesting level; orjson reports a ValueError
+            raise ValidationError(["Invalid JSON: nested too deeply"])
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_dict(cls, data: Any) -> 'IcebreakerRequest':
+        """Validate a decoded payload, reporting every problem at once"""
+        if not isinstance(data, dict) or not data:
+            raise ValidationError(["No data provided"])
+
+        errors: List[str] = []
+        request = cls(
+            user_a=UserProfile.from_dict(data.get('userA'), 'userA', errors),
+            user_b=UserProfile.from_dict(data.get('userB'), 'userB', errors),
+            meeting_date=_check_string(data.get('meetingDate'), 'meetingDate', errors),
+            location=_check_string(data.get('location'), 'location', errors),
+            model=_check_string(data.get('model'), 'model', errors)
+        )
+
+        seed = data.get('seed')
+        if seed is not None:
+            if isinstance(seed, bool) or not isinstance(seed, int) or not 0 <= seed <= MAX_SEED:
+                errors.append(f"seed must be an integer between 0 and {MAX_SEED}")
+            else:
+                request.seed = seed
+
+        if errors:
+            raise ValidationError(errors)
+        return request
+
+    def _canonical(self, **extra: Any) -> bytes:
+        """Serialize the fields that affect the output and extra values in a stable order"""
+        values = {
+            'userA': self.user_a.to_dict(),
+            'userB': self.user_b.to_dict(),
+            'meetingDate': self.meeting_date,
+            'location': self.location
+        }
+        values.update(extra)
+        return json.dumps(values, sort_keys=True, separators=(',', ':'),
+                          ensure_ascii=False).encode('utf-8')
+
+    def payload_seed(self, model: Optional[str] = None) -> int:
+        """Derive a stable sampling seed from the fields that affect the output
+
+        Pass the resolved model name so that omitting "model" and naming the
+        default model give the same seed. Servers with a single model leave
+        it out, and the "model" field is then ignored.
+        """
+        return int(hashlib.sha256(self._canonical(model=model)).hexdigest()[:8], 16)
+
+    def cache_key(self, model: str, seed: int) -> str:
+        """Key identifying the result of this request for a resolved model and seed"""
+        return hashlib.sha256(self._canonical(model=model, seed=seed)).hexdigest()
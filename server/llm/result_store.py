@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Cross-process result store for icebreaker responses
+
+Lets several server processes share generated results without an external
+service. Two implementations share the same get/put interface:
+
+- MmapResultStore: a hash table in a memory-mapped file with fixed-size
+  slots. Every process that opens the same file sees the same entries.
+  When a key's probe window is full, the oldest entry in it is evicted.
+- SocketResultStore: a client for an in-memory LRU store served over a
+  local Unix socket (run with: python result_store.py --serve PATH).
+
+Store failures are logged and treated as cache misses so they never fail a
+request. Both stores need POSIX features (fcntl file locks, Unix sockets)
+and refuse to start on platforms without them, such as Windows.
+"""
+
+import argparse
+import hashlib
+import logging
+import mmap
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from icebreaker_schema import dumps, loads
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Windows has no fcntl; MmapResultStore refuses to start there
+    FCNTL_AVAILABLE = False
+
+UNIX_SOCKETS_AVAILABLE = hasattr(socket, 'AF_UNIX')
+
+logger = logging.getLogger("icebreaker-generator")
+
+# Store defaults
+DEFAULT_SLOTS = 4096
+DEFAULT_SLOT_SIZE = 4096  # Bytes per slot including the slot header
+DEFAULT_SOCKET_ENTRIES = 4096
+PROBE_LENGTH = 8  # Slots examined per lookup before evicting
+
+# File header: magic, version, slot count, slot size
+FILE_HEADER = struct.Struct('<8sIII')
+FILE_MAGIC = b'ICEBRKR1'
+FILE_VERSION = 1
+
+# Slot header: key digest, write time, payload length
+SLOT_HEADER = struct.Struct('<16sdI')
+EMPTY_DIGEST = b'\0' * 16
+
+class ResultStore:
+    """Interface for stores shared between server processes"""
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored result for key, or None on a miss"""
+        raise NotImplementedError
+
+    def put(self, key: str, value: Dict[str, Any]) -> bool:
+        """Store a result, returning False if it could not be stored"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the store"""
+
+class MmapResultStore(ResultStore):
+    """Fixed-size hash table in a memory-mapped file shared by all processes"""
+
+    def __init__(self, path: str, slots: int = DEFAULT_SLOTS, slot_size: int = DEFAULT_SLOT_SIZE):
+        """Open the table at path, creating it if necessary"""
+        if not FCNTL_AVAILABLE:
+            raise RuntimeError("The memory-mapped result store needs fcntl file locks, "
+                               "which this platform does not provide")
+        if slots <= 0:
+            raise ValueError("slots must be positive")
+        if slot_size <= SLOT_HEADER.size:
+            raise ValueError(f"slot_size must be larger than {SLOT_HEADER.size} bytes")
+
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.size = FILE_HEADER.size + slots * slot_size
+
+        self._lock = threading.RLock()
+        self._fd = None
+        self._map = None
+        self._pid = None
+        self._open()
+
+    def _open(self):
+        """Open and map the file, initializing it if it is new"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size == 0:
+                    logger.info(f"Initializing result store {self.path} "
+                                f"({self.slots} slots of {self.slot_size} bytes)")
+                    os.ftruncate(fd, self.size)
+                    os.pwrite(fd, FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION,
+                                                   self.slots, self.slot_size), 0)
+                else:
+                    self._adopt_geometry(fd)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(fd, self.size)
+        except Exception:
+            os.close(fd)
+            raise
+
+        self._fd = fd
+        self._pid = os.getpid()
+
+    def _adopt_geometry(self, fd: int):
+        """Use the slot layout of an existing file so all processes agree on it"""
+        header = os.pread(fd, FILE_HEADER.size, 0)
+        if len(header) < FILE_HEADER.size:
+            raise ValueError(f"{self.path} is not a result store file")
+        magic, version, slots, slot_size = FILE_HEADER.unpack(header)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError(f"{self.path} is not a result store file")
+
+        if (slots, slot_size) != (self.slots, self.slot_size):
+            logger.warning(f"Result store {self.path} already has {slots} slots of "
+                           f"{slot_size} bytes; using that layout")
+            self.slots = slots
+            self.slot_size = slot_size
+            self.size = FILE_HEADER.size + slots * slot_size
+        if os.fstat(fd).st_size < self.size:
+            raise ValueError(f"Result store {self.path} is truncated")
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """Hold the in-process lock and a shared or exclusive file lock"""
+        with self._lock:
+            # flock is per open file, so a forked worker must reopen the file
+            if self._pid != os.getpid():
+                self._map.close()
+                os.close(self._fd)
+                self._open()
+
+            fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _probe(self, digest: bytes):
+        """Yield the slot offsets examined for a key digest"""
+        start = int.from_bytes(digest[:8], 'little') % self.slots
+        for i in range(min(PROBE_LENGTH, self.slots)):
+            yield FILE_HEADER.size + ((start + i) % self.slots) * self.slot_size
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored result for key, or None on a miss"""
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        try:
+            with self._locked(exclusive=False):
+                for offset in self._probe(digest):
+                    slot_digest, _, length = SLOT_HEADER.unpack_from(self._map, offset)
+                    if slot_digest == digest:
+                        start = offset + SLOT_HEADER.size
+                        return loads(self._map[start:start + length])
+                    if slot_digest == EMPTY_DIGEST:
+                        return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Result store read failed: {e}")
+        return None
+
+    def put(self, key: str, value: Dict[str, Any]) -> bool:
+        """Store a result, evicting the oldest entry in its probe window if full"""
+        data = dumps(value)
+        if len(data) > self.slot_size - SLOT_HEADER.size:
+            logger.debug(f"Result of {len(data)} bytes does not fit a {self.slot_size} byte slot")
+            return False
+
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        try:
+            with self._locked(exclusive=True):
+                target = None
+                oldest = None
+                for offset in self._probe(digest):
+                    slot_digest, written_at, _ = SLOT_HEADER.unpack_from(self._map, offset)
+                    if slot_digest in (digest, EMPTY_DIGEST):
+                        target = offset
+                        break
+                    if oldest is None or written_at < oldest[0]:
+                        oldest = (written_at, offset)
+                if target is None:
+                    target = oldest[1]
+
+                start = target + SLOT_HEADER.size
+                self._map[start:start + len(data)] = data
+                SLOT_HEADER.pack_into(self._map, target, digest, time.time(), len(data))
+            return True
+        except (OSError, ValueError) as e:
+            logger.warning(f"Result store write failed: {e}")
+            return False
+
+    def close(self):
+        """Unmap and close the file"""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+class SocketResultStore(ResultStore):
+    """Client for a result store served over a local Unix socket"""
+
+    def __init__(self, path: str, timeout: float = 1.0):
+        """Connect lazily to the store server listening at path"""
+        if not UNIX_SOCKETS_AVAILABLE:
+            raise RuntimeError("The socket result store needs Unix sockets, "
+                               "which this platform does not provide")
+        self.path = path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._reader = None
+
+    def _request(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Send one request line and read one response line, reconnecting once on failure"""
+        line = dumps(message) + b'\n'
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                        self._sock.settimeout(self.timeout)
+                        self._sock.connect(self.path)
+                        self._reader = self._sock.makefile('rb')
+                    self._sock.sendall(line)
+                    response = self._reader.readline()
+                    if not response:
+                        raise ConnectionError("Result store closed the connection")
+                    return loads(response)
+                except (OSError, ValueError) as e:
+                    self._disconnect()
+                    if attempt:
+                        logger.warning(f"Result store request failed: {e}")
+        return None
+
+    def _disconnect(self):
+        """Drop the current connection"""
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored result for key, or None on a miss"""
+        response = self._request({"op": "get", "key": key})
+        return response.get("value") if response else None
+
+    def put(self, key: str, value: Dict[str, Any]) -> bool:
+        """Store a result on the server"""
+        response = self._request({"op": "put", "key": key, "value": value})
+        return bool(response and response.get("ok"))
+
+    def close(self):
+        """Close the connection"""
+        with self._lock:
+            self._disconnect()
+
+class _StoreRequestHandler(socketserver.StreamRequestHandler):
+    """Serve newline-delimited JSON get/put requests against an LRU dict"""
+
+    def handle(self):
+        server = self.server
+        for line in self.rfile:
+            try:
+                message = loads(line)
+                key = message["key"]
+                with server.lock:
+                    if message["op"] == "get":
+                        value = server.entries.get(key)
+                        if value is not None:
+                            server.entries.move_to_end(key)
+                        response = {"value": value}
+                    elif message["op"] == "put":
+                        server.entries[key] = message["value"]
+                        server.entries.move_to_end(key)
+                        while len(server.entries) > server.max_entries:
+                            server.entries.popitem(last=False)
+                        response = {"ok": True}
+                    else:
+                        response = {"error": f"Unknown op: {message['op']}"}
+            except (KeyError, TypeError, ValueError) as e:
+                response = {"error": str(e)}
+            self.wfile.write(dumps(response) + b'\n')
+
+# UnixStreamServer only exists where the platform has Unix sockets
+if UNIX_SOCKETS_AVAILABLE:
+    class _StoreServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        """Threaded Unix socket server holding the shared entries"""
+        daemon_threads = True
+
+def serve_socket_store(path: str, max_entries: int = DEFAULT_SOCKET_ENTRIES):
+    """Run a socket result store at path until interrupted"""
+    if not UNIX_SOCKETS_AVAILABLE:
+        raise RuntimeError("The socket result store needs Unix sockets, "
+                           "which this platform does not provide")
+    if os.path.exists(path):
+        os.unlink(path)
+
+    server = _StoreServer(path, _StoreRequestHandler)
+    server.entries = OrderedDict()
+    server.max_entries = max_entries
+    server.lock = threading.Lock()
+    os.chmod(path, 0o600)
+
+    logger.info(f"Result store listening on {path} (max {max_entries} entries)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+def main():
+    """Run the socket result store server"""
+    parser = argparse.ArgumentParser(description='Serve a shared icebreaker result store')
+    parser.add_argument('--serve', type=str, required=True, help='Unix socket path to listen on')
+    parser.add_argument('--max-entries', type=int, default=DEFAULT_SOCKET_ENTRIES,
+                        help='Entries kept before least recently used ones are evicted')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    serve_socket_store(args.serve, args.max_entries)
+
+if __name__ == "__main__":
+    main()
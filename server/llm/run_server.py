@@ -3,13 +3,16 @@
 Simple Flask server for DistilGPT-2 icebreaker generation
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request
 from flask_cors import CORS
 import json
 import random
 
+from icebreaker_schema import IcebreakerRequest, install_json_errors, json_response
+
 app = Flask(__name__)
 CORS(app)
+install_json_errors(app)
 
 # Server configuration
 PORT = 8000
@@ -49,7 +52,7 @@ TOPICS = [
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "healthy", "model": "DistilGPT-2 (simulated)"})
+    return json_response({"status": "healthy", "model": "DistilGPT-2 (simulated)"})
 
 @app.route('/api/icebreakers', methods=['POST', 'HEAD'])
 def generate_icebreakers():
@@ -57,14 +60,17 @@ def generate_icebreakers():
     if request.method == 'HEAD':
         return '', 200
     
+    # Validate everything before building the response
+    payload = IcebreakerRequest.from_json(request.get_data(cache=False))
+    
     try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
+        user_a = payload.user_a.to_dict()
+        user_b = payload.user_b.to_dict()
+        location = payload.location or 'campus'
         
-        user_a = data.get('userA', {})
-        user_b = data.get('userB', {})
-        location = data.get('location', 'campus')
+        # Per-request RNG so identical requests always get identical icebreakers
+        seed = payload.seed if payload.seed is not None else payload.payload_seed()
+        rng = random.Random(seed)
         
         # Extract interests to personalize responses
         interests_a = user_a.get('interests', [])
@@ -77,17 +83,17 @@ def generate_icebreakers():
             common_interests = [i.lower() for i in interests_a if i.lower() in [j.lower() for j in interests_b]]
         
         # Select and personalize conversation starters
-        starters = random.sample(STARTERS, 2)
+        starters = rng.sample(STARTERS, 2)
         starters = [s.format(campus=campus) for s in starters]
         
         # Select activity
-        activity = random.choice(ACTIVITIES)
+        activity = rng.choice(ACTIVITIES)
         
         # Select or create shared topic
         if common_interests:
             shared_topic = f"You both share an interest in {common_interests[0]}. Discuss what aspects you enjoy most!"
         else:
-            shared_topic = random.choice(TOPICS)
+            shared_topic = rng.choice(TOPICS)
         
         # Format response like the LLM would
         raw_response = f"""
@@ -98,16 +104,17 @@ def generate_icebreakers():
 """
         
         # Return response
-        return jsonify({
+        return json_response({
             "conversationStarters": starters,
             "activity": activity,
             "sharedTopic": shared_topic,
-            "rawResponse": raw_response
+            "rawResponse": raw_response,
+            "seed": seed
         })
     
     except Exception as e:
         print(f"Error: {e}")
-        return jsonify({"error": str(e)}), 500
+        return json_response({"error": str(e)}, 500)
 
 if __name__ == "__main__":
     print(f"Starting simple LLM simulation server on port {PORT}...")
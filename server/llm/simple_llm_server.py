@@ -1,9 +1,12 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request
 from flask_cors import CORS
 import random
 
+from icebreaker_schema import IcebreakerRequest, install_json_errors, json_response
+
 app = Flask(__name__)
 CORS(app)
+install_json_errors(app)
 
 # Server port
 PORT = 8000
@@ -42,7 +45,7 @@ topics = [
 
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({"status": "healthy", "model": "DistilGPT-2 (simulated)"})
+    return json_response({"status": "healthy", "model": "DistilGPT-2 (simulated)"})
 
 @app.route('/api/icebreakers', methods=['POST', 'HEAD'])
 def icebreakers():
@@ -50,15 +53,19 @@ def icebreakers():
     if request.method == 'HEAD':
         return '', 200
     
+    # Validate everything before building the response
+    payload = IcebreakerRequest.from_json(request.get_data(cache=False))
+    
     # Handle POST requests for generating icebreakers
     try:
-        # Get data from request
-        data = request.json
+        # Per-request RNG so identical requests always get identical icebreakers
+        seed = payload.seed if payload.seed is not None else payload.payload_seed()
+        rng = random.Random(seed)
         
         # Generate response
-        selected_starters = random.sample(starters, 2)
-        selected_activity = random.choice(activities)
-        selected_topic = random.choice(topics)
+        selected_starters = rng.sample(starters, 2)
+        selected_activity = rng.choice(activities)
+        selected_topic = rng.choice(topics)
         
         # Format the raw response
         raw_response = f"""
@@ -69,16 +76,17 @@ def icebreakers():
 """
         
         # Return the response
-        return jsonify({
+        return json_response({
             "conversationStarters": selected_starters,
             "activity": selected_activity,
             "sharedTopic": selected_topic,
-            "rawResponse": raw_response
+            "rawResponse": raw_response,
+            "seed": seed
         })
     
     except Exception as e:
         print(f"Error: {e}")
-        return jsonify({"error": str(e)}), 500
+        return json_response({"error": str(e)}, 500)
 
 if __name__ == '__main__':
     print(f"Starting simple LLM server on port {PORT}")
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Test script for continuous batching
+Run with: python test_continuous_batching.py
+
+Uses a tiny randomly initialised GPT-2 and a character-level tokenizer, so
+no model download is needed. Checks that batching does not change what a
+request generates:
+
+- seeded requests give the same text batched as on their own, including
+  requests that join while others are decoding
+- greedy decoding matches model.generate()
+
+It also checks that stopping the batcher and errors during a step resolve
+every request instead of leaving callers waiting.
+"""
+
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import torch
+from transformers import GPT2Config, GPT2LMHeadModel
+
+from continuous_batching import ContinuousBatcher, BatcherStopped
+
+VOCAB_SIZE = 500
+EOS_TOKEN_ID = VOCAB_SIZE - 1
+GREEDY_TEMPERATURE = 1e-6
+
+# (prompt, max_new_tokens); more requests than slots so slots are reused
+REQUESTS = [
+    ("hello world", 5),
+    ("a much longer prompt about campus life and the courses students take " * 2, 40),
+    ("x", 12),
+    ("short one", 3),
+    ("what do you like to do at the weekend?", 25),
+    ("the last prompt here", 8),
+    ("music, travel and photography", 30),
+]
+
+failures = []
+
+def check(condition, description):
+    """Record and print the outcome of one check"""
+    if condition:
+        print(f"✅ {description}")
+    else:
+        print(f"❌ {description}")
+        failures.append(description)
+
+class CharTokenizer:
+    """Maps each character to one token id"""
+    eos_token_id = EOS_TOKEN_ID
+
+    def encode(self, text):
+        return [ord(c) % EOS_TOKEN_ID for c in text]
+
+    def decode(self, ids, skip_special_tokens=True):
+        return ''.join(f"<{i}>" for i in ids if i != EOS_TOKEN_ID)
+
+def build_pipe():
+    """Build a tiny random model with the attributes the batcher uses from a pipeline"""
+    torch.manual_seed(0)
+    config = GPT2Config(n_layer=2, n_head=2, n_embd=32, n_positions=256, vocab_size=VOCAB_SIZE,
+                        bos_token_id=EOS_TOKEN_ID, eos_token_id=EOS_TOKEN_ID)
+    return SimpleNamespace(model=GPT2LMHeadModel(config).eval(), tokenizer=CharTokenizer())
+
+def test_batched_matches_solo(pipe):
+    """Seeded requests generate the same text whatever else is in the batch"""
+    batcher = ContinuousBatcher(pipe, max_batch_size=3)
+    solo = [batcher.generate(prompt, max_new_tokens=limit, seed=i)
+            for i, (prompt, limit) in enumerate(REQUESTS)]
+
+    futures = [batcher.submit(prompt, max_new_tokens=limit, seed=i)
+               for i, (prompt, limit) in enumerate(REQUESTS)]
+    check([future.result() for future in futures] == solo,
+          "batched output matches solo output")
+
+    # Submit one request at a time so they join a batch that is already decoding
+    futures = []
+    for i, (prompt, limit) in enumerate(REQUESTS):
+        futures.append(batcher.submit(prompt, max_new_tokens=limit, seed=i))
+        time.sleep(0.01)
+    check([future.result() for future in futures] == solo,
+          "requests joining mid-decode match solo output")
+
+    unseeded = [batcher.submit(REQUESTS[1][0], max_new_tokens=20) for _ in range(3)]
+    check(len({future.result() for future in unseeded}) > 1, "unseeded requests are sampled independently")
+
+    stats = batcher.stats()
+    check(stats["active"] == 0 and stats["queued"] == 0, "no requests left active or queued")
+    batcher.stop()
+
+def test_greedy_matches_generate(pipe):
+    """Greedy decoding produces the same tokens as model.generate()"""
+    expected = []
+    for prompt, limit in REQUESTS:
+        input_ids = torch.tensor([pipe.tokenizer.encode(prompt)])
+        output = pipe.model.generate(input_ids, attention_mask=torch.ones_like(input_ids),
+                                     max_new_tokens=limit, do_sample=False,
+                                     pad_token_id=EOS_TOKEN_ID)
+        expected.append(prompt + pipe.tokenizer.decode(output[0, input_ids.shape[1]:].tolist()))
+
+    batcher = ContinuousBatcher(pipe, max_batch_size=4)
+    futures = [batcher.submit(prompt, max_new_tokens=limit, temperature=GREEDY_TEMPERATURE)
+               for prompt, limit in REQUESTS]
+    check([future.result() for future in futures] == expected,
+          "greedy batched output matches model.generate()")
+    batcher.stop()
+
+def test_long_prompt(pipe):
+    """Prompts longer than the context window are truncated instead of failing"""
+    batcher = ContinuousBatcher(pipe, max_batch_size=2)
+    text = batcher.generate("z" * 400, max_new_tokens=50, seed=1)
+    check(text.startswith("z" * 400) and "<" in text, "prompt longer than the context is truncated")
+    batcher.stop()
+
+def test_stop(pipe):
+    """Stopping finishes queued work and then refuses new requests"""
+    batcher = ContinuousBatcher(pipe, max_batch_size=2)
+    futures = [batcher.submit(prompt, max_new_tokens=limit, seed=i)
+               for i, (prompt, limit) in enumerate(REQUESTS)]
+    batcher.stop()
+    check(all(isinstance(future.result(timeout=30), str) for future in futures),
+          "requests queued before stop() still complete")
+
+    try:
+        batcher.submit("too late")
+        check(False, "submit() after stop() raises BatcherStopped")
+    except BatcherStopped:
+        check(True, "submit() after stop() raises BatcherStopped")
+
+    check(batcher.join(timeout=5), "scheduler thread exits after stop()")
+
+def test_step_failure(pipe):
+    """An error in a step fails the requests in that step only and the scheduler keeps running"""
+    batcher = ContinuousBatcher(pipe, max_batch_size=2)
+    step = batcher._step
+    calls = []
+
+    submitted = threading.Event()
+
+    def failing_step():
+        calls.append(1)
+        if len(calls) == 1:
+            # Hold the first step until all four are queued, so the failing
+            # second step runs the first two while the other two wait
+            submitted.wait(timeout=30)
+        if len(calls) == 2:
+            raise RuntimeError("step failed")
+        step()
+
+    batcher._step = failing_step
+    futures = [batcher.submit("abc", max_new_tokens=10, seed=i) for i in range(4)]
+    submitted.set()
+    outcomes = []
+    for future in futures:
+        try:
+            outcomes.append(future.result(timeout=30))
+        except RuntimeError as e:
+            outcomes.append(e)
+    check(all(isinstance(outcome, RuntimeError) and str(outcome) == "step failed"
+              for outcome in outcomes[:2]), "a failed step fails its requests")
+    check(all(isinstance(outcome, str) for outcome in outcomes[2:]),
+          "queued requests are not failed with the step and still complete")
+    check(isinstance(batcher.generate("abc", max_new_tokens=5, seed=1), str),
+          "scheduler keeps serving after a failed step")
+    batcher.stop()
+
+def main():
+    """Run all continuous batching checks"""
+    pipe = build_pipe()
+    test_batched_matches_solo(pipe)
+    test_greedy_matches_generate(pipe)
+    test_long_prompt(pipe)
+    test_stop(pipe)
+    test_step_failure(pipe)
+
+    if failures:
+        print(f"\n❌ {len(failures)} checks failed")
+        return False
+    print("\nContinuous batching is working correctly! ✅")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    if not success:
+        sys.exit(1)
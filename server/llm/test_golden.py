@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Golden-output regression suite for the icebreaker API
+
+Sends a fixed set of requests (with explicit seeds and with payload-derived
+seeds), checks that repeating a request gives the identical response, and
+compares every response against the recorded golden outputs.
+
+Run with:
+- python test_golden.py --url http://localhost:5000            (compare)
+- python test_golden.py --url http://localhost:5000 --update   (record)
+
+Golden files are stored per model in golden/. Servers that report the same
+model name but generate differently need their own file via --golden.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import urllib.request
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+# Fields compared between runs; everything else in the response is ignored
+COMPARED_FIELDS = ["conversationStarters", "activity", "sharedTopic", "rawResponse", "seed"]
+
+USER_A = {
+    "name": "Alex",
+    "campus": "Central Campus",
+    "interests": ["AI", "Music", "Photography"],
+    "languages": ["English", "Spanish"],
+    "goals": ["Graduate with honors", "Make new friends"],
+    "personality": "Outgoing and creative"
+}
+
+USER_B = {
+    "name": "Jordan",
+    "campus": "Central Campus",
+    "interests": ["Machine Learning", "Travel", "Music"],
+    "languages": ["English", "French"],
+    "goals": ["Internship experience", "Expand network"],
+    "personality": "Thoughtful and analytical"
+}
+
+USER_C = {
+    "name": "Sam",
+    "campus": "North Campus",
+    "interests": ["Basketball", "Cooking"],
+    "languages": ["English", "Korean"],
+    "goals": ["Learning"],
+    "personality": "Curious"
+}
+
+# Test cases: name -> request payload
+CASES = {
+    "shared-interest-seeded": {
+        "userA": USER_A, "userB": USER_B,
+        "meetingDate": "Next Friday", "location": "Campus Coffee Shop",
+        "seed": 42
+    },
+    "shared-interest-payload-seed": {
+        "userA": USER_A, "userB": USER_B,
+        "meetingDate": "Next Friday", "location": "Campus Coffee Shop"
+    },
+    "no-shared-interest-seeded": {
+        "userA": USER_A, "userB": USER_C,
+        "meetingDate": "Tomorrow", "location": "Library",
+        "seed": 7
+    },
+    "no-shared-interest-payload-seed": {
+        "userA": USER_C, "userB": USER_B,
+        "meetingDate": "Monday", "location": "Student Union"
+    },
+    "minimal-profiles": {
+        "userA": {"name": "Test User A"},
+        "userB": {"name": "Test User B"},
+        "seed": 0
+    }
+}
+
+def request_json(url, payload=None):
+    """Send a GET (no payload) or POST request and decode the JSON response"""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(
+        url,
+        data=data,
+        headers={'Content-Type': 'application/json'},
+        method='POST' if payload is not None else 'GET'
+    )
+    with urllib.request.urlopen(req, timeout=120) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+def default_golden_path(base_url):
+    """Return the golden file for the model reported by the server's health check"""
+    model = request_json(f"{base_url}/health").get("model", "unknown")
+    slug = re.sub(r'[^a-z0-9]+', '-', model.lower()).strip('-')
+    return os.path.join(GOLDEN_DIR, f"{slug}.json")
+
+def run_cases(base_url):
+    """Run every case twice and return the outputs plus any reproducibility failures"""
+    outputs = {}
+    failures = []
+    for name, payload in CASES.items():
+        first = request_json(f"{base_url}/api/icebreakers", payload)
+        second = request_json(f"{base_url}/api/icebreakers", payload)
+
+        result = {field: first.get(field) for field in COMPARED_FIELDS}
+        repeat = {field: second.get(field) for field in COMPARED_FIELDS}
+        if result != repeat:
+            failures.append(f"{name}: repeated request produced a different response")
+        if "seed" in payload and result["seed"] != payload["seed"]:
+            failures.append(f"{name}: server used seed {result['seed']} instead of {payload['seed']}")
+
+        outputs[name] = result
+    return outputs, failures
+
+def main():
+    """Compare the server's outputs with the golden file, or record it"""
+    parser = argparse.ArgumentParser(description='Golden-output regression suite')
+    parser.add_argument('--url', type=str, default='http://localhost:5000', help='Server base URL')
+    parser.add_argument('--golden', type=str, help='Golden file (default: golden/<model>.json)')
+    parser.add_argument('--update', action='store_true', help='Record outputs as the new golden file')
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    try:
+        golden_path = args.golden or default_golden_path(base_url)
+        outputs, failures = run_cases(base_url)
+    except urllib.error.URLError as e:
+        print(f"❌ Connection error: {e.reason}")
+        print("Please make sure the server is running.")
+        return False
+
+    if args.update:
+        if failures:
+            print("❌ Not recording golden outputs, the server is not reproducible:")
+            for failure in failures:
+                print(f"  - {failure}")
+            return False
+        os.makedirs(os.path.dirname(golden_path), exist_ok=True)
+        with open(golden_path, 'w', encoding='utf-8') as f:
+            json.dump(outputs, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"✅ Recorded {len(outputs)} golden outputs to {golden_path}")
+        return True
+
+    if not os.path.exists(golden_path):
+        print(f"❌ No golden file at {golden_path}; record one with --update")
+        return False
+
+    with open(golden_path, encoding='utf-8') as f:
+        golden = json.load(f)
+
+    for name, result in outputs.items():
+        if name not in golden:
+            failures.append(f"{name}: no golden output recorded")
+        elif golden[name] != result:
+            for field in COMPARED_FIELDS:
+                if golden[name].get(field) != result.get(field):
+                    failures.append(f"{name}: {field} differs from golden output")
+
+    if failures:
+        print(f"❌ {len(failures)} golden-output failures:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return False
+
+    print(f"✅ All {len(outputs)} cases match {golden_path}")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    if not success:
+        sys.exit(1)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test script for the icebreaker request schema
+Run with: python test_icebreaker_schema.py
+
+Checks the request limits (list and string lengths, item types, seeds),
+bodies with no data, deeply nested JSON with the standard library decoder,
+and the JSON 400 and 413 responses of run_server.py's Flask app.
+"""
+
+import json
+import os
+import sys
+
+import icebreaker_schema
+from icebreaker_schema import (IcebreakerRequest, ValidationError, MAX_BODY_BYTES,
+                               MAX_LIST_ITEMS, MAX_SEED, MAX_STRING_LENGTH)
+from run_server import app
+
+failures = []
+
+def check(condition, description):
+    """Record and print the outcome of one check"""
+    if condition:
+        print(f"✅ {description}")
+    else:
+        print(f"❌ {description}")
+        failures.append(description)
+
+def validation_errors(body):
+    """Return the validation errors for a raw body, or None if it is valid"""
+    try:
+        IcebreakerRequest.from_json(body)
+        return None
+    except ValidationError as e:
+        return e.errors
+
+def errors_for(payload):
+    """Return the validation errors for a payload encoded as JSON"""
+    return validation_errors(json.dumps(payload).encode('utf-8'))
+
+def test_valid_request():
+    """A full request decodes into typed fields"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_request.json")
+    with open(path, "rb") as f:
+        request = IcebreakerRequest.from_json(f.read())
+    check(request.user_a.name == "Test User A" and request.user_b.interests == ["AI", "Photography", "Sports"],
+          "sample request is accepted")
+
+    request = IcebreakerRequest.from_json(b'{"userA": {"name": "A", "shoeSize": 42}, "seed": 5}')
+    check(request.user_a.to_dict() == {"name": "A"} and request.seed == 5,
+          "unknown profile fields are ignored")
+
+def test_list_limits():
+    """Profile lists are limited in length and must hold strings"""
+    at_limit = ["x"] * MAX_LIST_ITEMS
+    check(errors_for({"userA": {"interests": at_limit}}) is None,
+          f"a list of {MAX_LIST_ITEMS} items is accepted")
+    check(errors_for({"userA": {"interests": at_limit + ["x"]}}) ==
+          [f"userA.interests must have at most {MAX_LIST_ITEMS} items"],
+          f"a list of {MAX_LIST_ITEMS + 1} items is rejected")
+    check(errors_for({"userB": {"goals": "travel"}}) == ["userB.goals must be a list of strings"],
+          "a string in place of a list is rejected")
+    check(errors_for({"userA": {"languages": ["English", 3, None, {"a": 1}]}}) ==
+          ["userA.languages[1] must be a string", "userA.languages[2] must be a string",
+           "userA.languages[3] must be a string"],
+          "non-string list items are rejected with their index")
+
+def test_string_limits():
+    """String values are limited in length and must be strings"""
+    at_limit = "x" * MAX_STRING_LENGTH
+    check(errors_for({"userA": {"name": at_limit}, "location": at_limit}) is None,
+          f"strings of {MAX_STRING_LENGTH} characters are accepted")
+    check(errors_for({"location": at_limit + "x"}) ==
+          [f"location must be at most {MAX_STRING_LENGTH} characters"],
+          f"a string of {MAX_STRING_LENGTH + 1} characters is rejected")
+    check(errors_for({"userA": {"interests": [at_limit + "x"]}}) ==
+          [f"userA.interests[0] must be at most {MAX_STRING_LENGTH} characters"],
+          "an overlong list item is rejected")
+    check(errors_for({"userA": {"name": 7}, "meetingDate": ["Friday"]}) ==
+          ["userA.name must be a string", "meetingDate must be a string"],
+          "every invalid field is reported at once")
+
+def test_seeds():
+    """Seeds must be integers within 32 bits"""
+    check(errors_for({"seed": 0}) is None and errors_for({"seed": MAX_SEED}) is None,
+          "seeds 0 and 2^32-1 are accepted")
+    message = [f"seed must be an integer between 0 and {MAX_SEED}"]
+    for seed in (True, False, -1, MAX_SEED + 1, 1.5, "42"):
+        check(errors_for({"seed": seed}) == message, f"seed {seed!r} is rejected")
+
+def test_empty_bodies():
+    """Bodies without any data are rejected"""
+    for body in (b"", b"[]", b"{}", b"null", b'"text"'):
+        check(validation_errors(body) == ["No data provided"], f"body {body!r} is rejected as empty")
+    errors = validation_errors(b'{"userA": ')
+    check(errors is not None and errors[0].startswith("Invalid JSON"), "malformed JSON is rejected")
+
+def test_deep_nesting():
+    """Deeply nested JSON is rejected, including with the standard library decoder"""
+    # Under the body limit, but deeper than the stdlib decoder's recursion limit
+    depth = (MAX_BODY_BYTES - 16) // 2
+    body = b'{"userA": ' + b'[' * depth + b']' * depth + b'}'
+    original = icebreaker_schema.ORJSON_AVAILABLE
+    try:
+        icebreaker_schema.ORJSON_AVAILABLE = False
+        errors = validation_errors(body)
+    finally:
+        icebreaker_schema.ORJSON_AVAILABLE = original
+    check(errors == ["Invalid JSON: nested too deeply"],
+          "deeply nested JSON is rejected by the standard library decoder")
+
+    if original:
+        # orjson either refuses the depth or decodes it; the schema rejects it either way
+        check(validation_errors(body) is not None, "deeply nested JSON is rejected with orjson")
+
+def test_server_responses():
+    """run_server.py answers invalid and oversized requests with JSON errors"""
+    client = app.test_client()
+
+    response = client.post('/api/icebreakers', json={"userA": {"interests": ["x"] * (MAX_LIST_ITEMS + 1)},
+                                                      "seed": -1})
+    data = response.get_json()
+    check(response.status_code == 400 and response.mimetype == "application/json",
+          "an invalid request gets a 400 JSON response")
+    check(data["error"] == "Invalid request" and len(data["details"]) == 2,
+          "the 400 response lists every invalid field")
+
+    response = client.post('/api/icebreakers', data=b"", content_type="application/json")
+    check(response.status_code == 400 and response.get_json()["details"] == ["No data provided"],
+          "an empty body gets a 400 JSON response")
+
+    body = json.dumps({"userA": {"name": "x" * MAX_BODY_BYTES}})
+    response = client.post('/api/icebreakers', data=body, content_type="application/json")
+    check(response.status_code == 413 and response.mimetype == "application/json" and
+          str(MAX_BODY_BYTES) in response.get_json()["error"],
+          "an oversized body gets a 413 JSON response")
+
+    response = client.post('/api/icebreakers', json={"userA": {"name": "A"}, "seed": 3})
+    check(response.status_code == 200 and response.get_json()["seed"] == 3,
+          "a valid request still succeeds")
+
+def main():
+    """Run all schema checks"""
+    test_valid_request()
+    test_list_limits()
+    test_string_limits()
+    test_seeds()
+    test_empty_bodies()
+    test_deep_nesting()
+    test_server_responses()
+
+    if failures:
+        print(f"\n❌ {len(failures)} checks failed")
+        return False
+    print("\nRequest schema is working correctly! ✅")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    if not success:
+        sys.exit(1)
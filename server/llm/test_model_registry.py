@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Test script for the model registry
+Run with: python test_model_registry.py
+
+Model loading and RSS are stubbed, so no model is downloaded. Each stub
+pipeline counts as MODEL_MB of RSS for as long as something references it,
+which makes an unload that leaves the model alive visible. Checks LRU
+order, idle unloading, the RSS budget (without unloading more models than
+needed, also when a model is still in use or held by a continuous batching
+scheduler) and disk cache pruning.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import weakref
+
+import torch
+from transformers import GPT2Config, GPT2LMHeadModel
+
+import transformers_generator
+from transformers_generator import IcebreakerGenerator, ModelRegistry, GenerationProfiler
+
+BASE_MB = 100  # RSS with no model loaded
+MODEL_MB = 200  # RSS of each live stub pipeline
+VOCAB_SIZE = 64
+
+failures = []
+live_pipes = weakref.WeakSet()
+stub_options = {"with_model": False}  # Batching needs a real (tiny) model
+
+def check(condition, description):
+    """Record and print the outcome of one check"""
+    if condition:
+        print(f"✅ {description}")
+    else:
+        print(f"❌ {description}")
+        failures.append(description)
+
+class StubTokenizer:
+    """Maps each character to one token id"""
+    eos_token_id = VOCAB_SIZE - 1
+
+    def encode(self, text):
+        return [ord(c) % self.eos_token_id for c in text]
+
+    def decode(self, ids, skip_special_tokens=True):
+        return ''.join(f"<{i}>" for i in ids if i != self.eos_token_id)
+
+class StubPipe:
+    """Stands in for a text-generation pipeline; a tiny model is built only for batching"""
+
+    def __init__(self, model_name, with_model=False):
+        self.model_name = model_name
+        self.tokenizer = StubTokenizer()
+        self.model = None
+        if with_model:
+            config = GPT2Config(n_layer=1, n_head=1, n_embd=8, n_positions=64, vocab_size=VOCAB_SIZE,
+                                bos_token_id=VOCAB_SIZE - 1, eos_token_id=VOCAB_SIZE - 1)
+            self.model = GPT2LMHeadModel(config).eval()
+        live_pipes.add(self)
+
+def stub_rss_mb():
+    """RSS of the stubbed process: a base plus every pipeline still referenced"""
+    return BASE_MB + MODEL_MB * len(live_pipes)
+
+def stub_load(registry, model_name):
+    """Replacement for ModelRegistry._load"""
+    return StubPipe(model_name, **stub_options)
+
+def loaded(registry):
+    """Names of the loaded models, least recently used first"""
+    return list(registry._pipelines)
+
+def test_lru_order(cache_dir):
+    """Using a model moves it to the end of the LRU order"""
+    registry = ModelRegistry(["a", "b", "c"], cache_dir)
+    registry.get("a")
+    registry.get("b")
+    registry.get("c")
+    check(loaded(registry) == ["a", "b", "c"], "models are kept in load order")
+    registry.get("a")
+    check(loaded(registry) == ["b", "c", "a"], "using a model makes it the most recently used")
+    check(registry.get() is registry.get("a"), "the first registered model is the default")
+
+    try:
+        registry.get("unknown")
+        check(False, "an unknown model is refused")
+    except ValueError:
+        check(True, "an unknown model is refused")
+
+def test_idle_unload(cache_dir):
+    """Models idle for longer than idle_timeout are unloaded on the next request"""
+    registry = ModelRegistry(["a", "b", "c"], cache_dir, idle_timeout=0.2)
+    registry.get("a")
+    registry.get("b")
+    time.sleep(0.3)
+    registry.get("b")
+    check(loaded(registry) == ["b"], "an idle model is unloaded, the requested one is kept")
+
+    registry.get("c")
+    check(loaded(registry) == ["b", "c"], "recently used models are kept")
+    check(len(live_pipes) == 2, "unloaded models are freed")
+
+def test_memory_budget(cache_dir):
+    """Least recently used models are unloaded until RSS fits the budget"""
+    # Room for two models
+    registry = ModelRegistry(["a", "b", "c"], cache_dir,
+                             memory_budget_mb=BASE_MB + 2 * MODEL_MB)
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")
+    registry.get("c")
+    check(loaded(registry) == ["a", "c"], "the least recently used model is unloaded over budget")
+    check(stub_rss_mb() <= registry.memory_budget_mb, "RSS fits the budget again")
+
+    registry.get("b")
+    check(loaded(registry) == ["c", "b"], "loading another model unloads only one more")
+
+def test_budget_with_model_in_use(cache_dir):
+    """An unload that does not lower RSS stops eviction instead of unloading every model"""
+    registry = ModelRegistry(["a", "b", "c"], cache_dir,
+                             memory_budget_mb=BASE_MB + 2 * MODEL_MB)
+    in_flight = registry.get("a")  # Held like a request that is still generating
+    registry.get("b")
+    registry.get("c")
+    check(loaded(registry) == ["b", "c"], "only the least recently used model is unloaded")
+    check(in_flight.model_name == "a" and len(live_pipes) == 3,
+          "the in-use model stays alive until its request finishes")
+    del in_flight
+
+def test_budget_with_batching(cache_dir):
+    """Unloading a batched model waits for its scheduler, so RSS drops right away"""
+    stub_options["with_model"] = True
+    try:
+        generator = IcebreakerGenerator("a", extra_models=["b", "c"],
+                                        memory_budget_mb=BASE_MB + 2 * MODEL_MB,
+                                        profiler=GenerationProfiler(cache_dir), max_batch_size=2)
+        generator.registry.cache_dir = cache_dir
+        for name in ("a", "b", "c"):
+            generator.generate("hello", max_length=3, model_name=name, seed=1)
+        check(loaded(generator.registry) == ["b", "c"],
+              "only the least recently used batched model is unloaded")
+        check(len(live_pipes) == 2, "the unloaded model is freed once its scheduler exits")
+        check(set(generator.batching_status()) == {"b", "c"}, "the unloaded model's batcher is removed")
+    finally:
+        stub_options["with_model"] = False
+
+def make_entry(cache_dir, name, size_mb, age):
+    """Create a model download of size_mb last used age seconds ago"""
+    path = os.path.join(cache_dir, name)
+    os.makedirs(os.path.join(path, "blobs"))
+    with open(os.path.join(path, "blobs", "weights"), "wb") as f:
+        f.write(b"\0" * int(size_mb * 1024 * 1024))
+    used = time.time() - age
+    os.utime(path, (used, used))
+    return path
+
+def test_prune_disk_cache(cache_dir):
+    """The least recently used downloads are removed, except those of loaded models"""
+    old = make_entry(cache_dir, "models--org--old", 1, age=300)
+    loaded_old = make_entry(cache_dir, "models--a", 1, age=200)
+    middle = make_entry(cache_dir, "models--middle", 1, age=100)
+    recent = make_entry(cache_dir, "models--recent", 1, age=0)
+
+    registry = ModelRegistry(["a", "org/old"], cache_dir, cache_max_mb=2.5)
+    check(registry._cache_entry("org/old") == old, "model names map to Hugging Face cache entries")
+    registry.get("a")
+
+    remaining = [path for path in (old, loaded_old, middle, recent) if os.path.isdir(path)]
+    check(remaining == [loaded_old, recent],
+          "oldest entries are removed until the cache fits, skipping the loaded model")
+
+    registry.cache_max_mb = 0.5
+    check(registry.prune_disk_cache() == [recent] and os.path.isdir(loaded_old),
+          "the loaded model's entry is kept even above the cap")
+
+def main():
+    """Run all model registry checks"""
+    ModelRegistry._load = stub_load
+    transformers_generator.get_rss_mb = stub_rss_mb
+    torch.manual_seed(0)
+
+    tests = [test_lru_order, test_idle_unload, test_memory_budget,
+             test_budget_with_model_in_use, test_budget_with_batching, test_prune_disk_cache]
+    for test in tests:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            test(cache_dir)
+
+    if failures:
+        print(f"\n❌ {len(failures)} checks failed")
+        return False
+    print("\nModel registry is working correctly! ✅")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    if not success:
+        sys.exit(1)
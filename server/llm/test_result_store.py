@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Test script for the cross-process result store
+Run with: python test_result_store.py
+
+Covers the memory-mapped store (round trip, eviction order, oversized
+values, existing files with a different layout, a forked writer) and the
+Unix socket store, and that both refuse to start on platforms without fcntl
+or Unix sockets. Needs a POSIX system for fork, flock and Unix sockets.
+"""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from result_store import (MmapResultStore, SocketResultStore, serve_socket_store,
+                          PROBE_LENGTH, SLOT_HEADER)
+
+failures = []
+
+def check(condition, description):
+    """Record and print the outcome of one check"""
+    if condition:
+        print(f"✅ {description}")
+    else:
+        print(f"❌ {description}")
+        failures.append(description)
+
+def test_round_trip(directory):
+    """Values written can be read back and unknown keys miss"""
+    store = MmapResultStore(os.path.join(directory, "round_trip"), slots=64, slot_size=512)
+    value = {"conversationStarters": ["Hi?", "Café?"], "seed": 42}
+    check(store.put("pair-1", value), "put stores a value")
+    check(store.get("pair-1") == value, "get returns the stored value")
+    check(store.get("pair-2") is None, "get misses for an unknown key")
+
+    store.put("pair-1", {"seed": 7})
+    check(store.get("pair-1") == {"seed": 7}, "put replaces the value of an existing key")
+    store.close()
+
+def test_eviction_order(directory):
+    """A full probe window evicts its oldest entry first"""
+    # With as many slots as the probe length, every key probes the whole table
+    store = MmapResultStore(os.path.join(directory, "eviction"), slots=PROBE_LENGTH, slot_size=128)
+    keys = [f"key-{i}" for i in range(PROBE_LENGTH)]
+    for i, key in enumerate(keys):
+        store.put(key, {"i": i})
+        time.sleep(0.002)  # Distinct write times
+
+    store.put("newcomer", {"i": "new"})
+    check(store.get(keys[0]) is None, "oldest entry is evicted when the table is full")
+    check(all(store.get(key) == {"i": i} for i, key in enumerate(keys) if i > 0),
+          "newer entries survive the eviction")
+    check(store.get("newcomer") == {"i": "new"}, "new entry is stored in the evicted slot")
+
+    time.sleep(0.002)
+    store.put("another", {"i": "another"})
+    check(store.get(keys[1]) is None and store.get("newcomer") is not None,
+          "next eviction takes the next oldest entry")
+    store.close()
+
+def test_oversized_value(directory):
+    """Values larger than a slot are refused without touching the table"""
+    slot_size = 128
+    store = MmapResultStore(os.path.join(directory, "oversized"), slots=16, slot_size=slot_size)
+    store.put("small", {"ok": True})
+
+    too_big = {"text": "x" * slot_size}
+    check(not store.put("big", too_big), "put refuses a value larger than a slot")
+    check(store.get("big") is None, "refused value is not readable")
+    check(store.get("small") == {"ok": True}, "existing entries are untouched")
+
+    exact = "x" * (slot_size - SLOT_HEADER.size - len('{"t":""}'))
+    check(store.put("exact", {"t": exact}) and store.get("exact") == {"t": exact},
+          "a value that exactly fills a slot is stored")
+    store.close()
+
+def test_geometry_mismatch(directory):
+    """Opening an existing file adopts its layout instead of rewriting it"""
+    path = os.path.join(directory, "geometry")
+    first = MmapResultStore(path, slots=32, slot_size=256)
+    first.put("shared", {"from": "first"})
+
+    second = MmapResultStore(path, slots=1024, slot_size=4096)
+    check((second.slots, second.slot_size) == (32, 256), "second opener adopts the existing layout")
+    check(os.path.getsize(path) == first.size, "file is not resized")
+    check(second.get("shared") == {"from": "first"}, "entries written before are still visible")
+    first.close()
+    second.close()
+
+    foreign = os.path.join(directory, "foreign")
+    with open(foreign, "wb") as f:
+        f.write(b"not a result store" * 10)
+    try:
+        MmapResultStore(foreign)
+        check(False, "a foreign file is rejected")
+    except ValueError:
+        check(True, "a foreign file is rejected")
+    with open(foreign, "rb") as f:
+        check(f.read() == b"not a result store" * 10, "a foreign file is left unchanged")
+
+def _forked_writer(store, count):
+    """Write entries from a forked child using the parent's store object"""
+    for i in range(count):
+        store.put(f"child-{i}", {"child": i, "pid": os.getpid()})
+    # Read back something the parent wrote before the fork
+    sys.exit(0 if store.get("parent") == {"from": "parent"} else 1)
+
+def test_forked_writer(directory):
+    """A forked worker reopens the file and shares entries with its parent"""
+    store = MmapResultStore(os.path.join(directory, "forked"), slots=256, slot_size=256)
+    store.put("parent", {"from": "parent"})
+
+    context = multiprocessing.get_context("fork")
+    children = [context.Process(target=_forked_writer, args=(store, 20)) for _ in range(2)]
+    for child in children:
+        child.start()
+    # Keep writing from the parent while the children write
+    for i in range(20):
+        store.put(f"parent-{i}", {"parent": i})
+    for child in children:
+        child.join()
+
+    check(all(child.exitcode == 0 for child in children), "forked writers see the parent's entries")
+    values = [store.get(f"child-{i}") for i in range(20)]
+    check(all(value is not None and value["child"] == i for i, value in enumerate(values)),
+          "parent sees every entry written by the forked writers")
+    check(all(value["pid"] != os.getpid() for value in values), "entries came from the children")
+    check(all(store.get(f"parent-{i}") == {"parent": i} for i in range(20)),
+          "parent writes made during the fork survive")
+    store.close()
+
+def test_socket_store(directory):
+    """The socket store round-trips values and evicts least recently used entries"""
+    path = os.path.join(directory, "store.sock")
+    server = threading.Thread(target=serve_socket_store, args=(path, 2), daemon=True)
+    server.start()
+    for _ in range(50):
+        if os.path.exists(path):
+            break
+        time.sleep(0.05)
+
+    client = SocketResultStore(path)
+    check(client.put("a", {"v": 1}) and client.get("a") == {"v": 1}, "socket store round trip")
+    client.put("b", {"v": 2})
+    client.get("a")  # "a" is now the most recently used
+    client.put("c", {"v": 3})
+    check(client.get("b") is None and client.get("a") == {"v": 1} and client.get("c") == {"v": 3},
+          "socket store evicts the least recently used entry")
+
+    other = SocketResultStore(path)
+    check(other.get("c") == {"v": 3}, "a second client sees the same entries")
+    client.close()
+    other.close()
+
+    missing = SocketResultStore(os.path.join(directory, "missing.sock"), timeout=0.2)
+    check(missing.get("a") is None and not missing.put("a", {}),
+          "an unreachable socket store behaves as a miss")
+
+# Hides fcntl and Unix sockets the way Windows lacks them, then tries each store
+UNSUPPORTED_PLATFORM_SCRIPT = """
+import socket, sys
+del socket.AF_UNIX
+sys.modules['fcntl'] = None
+import result_store
+for create in (lambda: result_store.MmapResultStore(sys.argv[1] + '/store'),
+               lambda: result_store.SocketResultStore(sys.argv[1] + '/store.sock'),
+               lambda: result_store.serve_socket_store(sys.argv[1] + '/store.sock')):
+    try:
+        create()
+        print('started')
+    except RuntimeError:
+        print('refused')
+"""
+
+def test_unsupported_platform(directory):
+    """Without fcntl or Unix sockets the module imports and the stores refuse to start"""
+    result = subprocess.run(
+        [sys.executable, "-c", UNSUPPORTED_PLATFORM_SCRIPT, directory],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, timeout=60
+    )
+    check(result.returncode == 0, "module imports without fcntl and Unix sockets")
+    check(result.stdout.split() == ["refused"] * 3,
+          "stores refuse to start without fcntl and Unix sockets")
+
+def main():
+    """Run all result store checks"""
+    with tempfile.TemporaryDirectory() as directory:
+        test_round_trip(directory)
+        test_eviction_order(directory)
+        test_oversized_value(directory)
+        test_geometry_mismatch(directory)
+        test_forked_writer(directory)
+        test_socket_store(directory)
+        test_unsupported_platform(directory)
+
+    if failures:
+        print(f"\n❌ {len(failures)} checks failed")
+        return False
+    print("\nResult store is working correctly! ✅")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    if not success:
+        sys.exit(1)
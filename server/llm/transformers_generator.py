@@ -17,14 +17,30 @@ Usage:
 """
 
 import argparse
+import gc
+import hmac
 import json
 import re
+import shutil
 import sys
 import os
 import logging
-from typing import Dict, List, Any
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, List, Any, Optional
 from datetime import datetime
 
+from icebreaker_schema import IcebreakerRequest, install_json_errors, json_response, loads
+
+if TYPE_CHECKING:
+    # Imported only when batching is enabled; it needs torch
+    from continuous_batching import ContinuousBatcher
+    # Imported in main() only when a store is configured; it needs POSIX features
+    from result_store import ResultStore
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -42,7 +58,7 @@ logger.info(f"Running with Python {python_version.major}.{python_version.minor}.
 
 try:
     import torch
-    from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
+    from transformers import pipeline, set_seed, AutoTokenizer, AutoModelForCausalLM
     TRANSFORMERS_AVAILABLE = True
     logger.info(f"PyTorch version: {torch.__version__}")
     logger.info(f"CUDA available: {torch.cuda.is_available()}")
@@ -56,34 +72,181 @@ except ImportError as e:
 # Using DistilGPT-2 as the default model - lightweight and efficient for local use
 DEFAULT_MODEL = "distilgpt2"  # Approximately 82 million parameters
 
-class IcebreakerGenerator:
-    """Generate icebreakers using transformers models"""
+# Memory management defaults (0 disables the corresponding limit)
+DEFAULT_MEMORY_BUDGET_MB = 0  # Process RSS budget for loaded models
+DEFAULT_CACHE_MAX_MB = 0  # Size cap for the on-disk model_cache directory
+DEFAULT_IDLE_TIMEOUT = 600  # Seconds before an unused model is unloaded
+
+def get_rss_mb() -> Optional[float]:
+    """Return the resident set size of this process in MB, or None if unknown"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
     
-    def __init__(self, model_name: str = DEFAULT_MODEL):
-        """Initialize the generator with specified model"""
-        if not TRANSFORMERS_AVAILABLE:
-            raise ImportError("Transformers library not available")
+    # Fall back to procfs on Linux when psutil is not installed
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def _dir_size(path: str) -> int:
+    """Return the total size in bytes of all files below path"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+class ModelRegistry:
+    """Serve several text-generation models side by side within a memory budget
+    
+    Models are loaded lazily on first use and kept in LRU order. Models that
+    have been idle for longer than idle_timeout are unloaded, and when the
+    process RSS exceeds memory_budget_mb the least recently used models are
+    unloaded until it fits again. The on-disk cache is pruned to cache_max_mb
+    by removing the least recently used model downloads.
+    """
+    
+    def __init__(self, model_names: List[str], cache_dir: str,
+                 memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+                 cache_max_mb: float = DEFAULT_CACHE_MAX_MB,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        """Register the available models; the first one is the default"""
+        if not model_names:
+            raise ValueError("At least one model must be registered")
         
-        self.model_name = model_name
-        self.generator = None
-        self.cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_cache")
-        os.makedirs(self.cache_dir, exist_ok=True)
-        logger.info(f"Model cache directory: {self.cache_dir}")
+        self.model_names = list(dict.fromkeys(model_names))
+        self.default_model = self.model_names[0]
+        self.cache_dir = cache_dir
+        self.memory_budget_mb = memory_budget_mb
+        self.cache_max_mb = cache_max_mb
+        self.idle_timeout = idle_timeout
         
-        # Load in lazy mode to avoid loading model until needed
-        self._initialize_generator()
+        self._pipelines: "OrderedDict[str, Any]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        # Set when the model named by the key has finished loading (or failed to)
+        self._loading: Dict[str, threading.Event] = {}
+        self._lock = threading.RLock()
+        # Serializes loads: from_pretrained is not safe to run in parallel (weight
+        # tying can race and leave heads uninitialised), and one load at a time
+        # keeps two large models from being materialised at once
+        self._load_lock = threading.Lock()
+        
+        # Called with the model name after a model is unloaded
+        self.on_unload = None
     
-    def _initialize_generator(self):
-        """Initialize the text generation pipeline"""
+    def has(self, model_name: str) -> bool:
+        """Check whether a model is registered"""
+        return model_name in self.model_names
+    
+    def get(self, model_name: Optional[str] = None):
+        """Return the pipeline for a model, loading it if necessary"""
+        name = model_name or self.default_model
+        if not self.has(name):
+            raise ValueError(f"Unknown model: {name}")
+        
+        self.unload_idle(exclude=name)
+        
+        while True:
+            with self._lock:
+                pipe = self._pipelines.get(name)
+                if pipe is not None:
+                    self._pipelines.move_to_end(name)
+                    self._last_used[name] = time.monotonic()
+                    return pipe
+                
+                loading = self._loading.get(name)
+                if loading is None:
+                    loading = self._loading[name] = threading.Event()
+                    break
+            
+            # Another request is loading this model; check again once it is done
+            loading.wait()
+        
+        # Load without holding the registry lock so requests for other models keep running
         try:
-            logger.info(f"Loading model: {self.model_name}")
+            with self._load_lock:
+                # Free memory before loading so two large models never overlap
+                self._enforce_budget(exclude=name)
+                pipe = self._load(name)
+            with self._lock:
+                self._pipelines[name] = pipe
+                self._last_used[name] = time.monotonic()
+            self._enforce_budget(exclude=name)
+            self.prune_disk_cache()
+            return pipe
+        finally:
+            with self._lock:
+                self._loading.pop(name, None)
+            loading.set()
+    
+    def unload(self, model_name: str) -> bool:
+        """Unload a model and release its memory"""
+        with self._lock:
+            pipe = self._pipelines.pop(model_name, None)
+            self._last_used.pop(model_name, None)
+        if pipe is None:
+            return False
+        
+        # Let holders of other references (e.g. a batcher) release them first
+        if self.on_unload is not None:
+            self.on_unload(model_name)
+        del pipe
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        logger.info(f"Unloaded model: {model_name}")
+        return True
+    
+    def unload_idle(self, exclude: Optional[str] = None) -> List[str]:
+        """Unload every model that has not been used within idle_timeout"""
+        if not self.idle_timeout or self.idle_timeout <= 0:
+            return []
+        
+        now = time.monotonic()
+        with self._lock:
+            idle = [name for name, last_used in self._last_used.items()
+                    if name != exclude and now - last_used > self.idle_timeout]
+        for name in idle:
+            logger.info(f"Model {name} idle for more than {self.idle_timeout}s")
+            self.unload(name)
+        return idle
+    
+    def status(self) -> Dict[str, Any]:
+        """Describe registered and loaded models and current memory use"""
+        with self._lock:
+            loaded = list(self._pipelines.keys())
+        return {
+            "default": self.default_model,
+            "available": self.model_names,
+            "loaded": loaded,
+            "rssMb": get_rss_mb(),
+            "memoryBudgetMb": self.memory_budget_mb or None,
+            "cacheMaxMb": self.cache_max_mb or None
+        }
+    
+    def _load(self, model_name: str):
+        """Load the text generation pipeline for a model"""
+        try:
+            logger.info(f"Loading model: {model_name}")
             start_time = datetime.now()
             
-            self.generator = pipeline(
+            # Load explicitly so downloads land in cache_dir; pipeline() would
+            # forward cache_dir to generate() instead
+            tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=self.cache_dir)
+            model = AutoModelForCausalLM.from_pretrained(model_name, cache_dir=self.cache_dir)
+            pipe = pipeline(
                 "text-generation", 
-                model=self.model_name,
-                device=0 if torch.cuda.is_available() else -1,  # Use GPU if available
-                cache_dir=self.cache_dir
+                model=model,
+                tokenizer=tokenizer,
+                device=0 if torch.cuda.is_available() else -1  # Use GPU if available
             )
             
             end_time = datetime.now()
@@ -93,17 +256,419 @@ class IcebreakerGenerator:
         except Exception as e:
             logger.error(f"Error loading model: {e}")
             raise
+        
+        # Mark the download as recently used for disk cache pruning
+        cache_entry = self._cache_entry(model_name)
+        if os.path.isdir(cache_entry):
+            os.utime(cache_entry)
+        return pipe
+    
+    def _enforce_budget(self, exclude: Optional[str] = None):
+        """Unload least recently used models until RSS fits the budget
+        
+        Stops early when an unload does not lower RSS: the model is still
+        referenced (e.g. by an in-flight request), so unloading more models
+        would not help until that reference is released.
+        """
+        if not self.memory_budget_mb or self.memory_budget_mb <= 0:
+            return
+        
+        rss = get_rss_mb()
+        while rss is not None and rss > self.memory_budget_mb:
+            with self._lock:
+                candidates = [name for name in self._pipelines if name != exclude]
+            if not candidates:
+                logger.warning(f"RSS {rss:.0f}MB exceeds budget of "
+                               f"{self.memory_budget_mb:.0f}MB with nothing left to unload")
+                return
+            
+            logger.info(f"RSS {rss:.0f}MB exceeds budget of {self.memory_budget_mb:.0f}MB")
+            self.unload(candidates[0])
+            
+            previous, rss = rss, get_rss_mb()
+            if rss is not None and rss >= previous:
+                logger.warning(f"Unloading {candidates[0]} did not lower RSS ({rss:.0f}MB); "
+                               f"its memory is still in use, so no further models are unloaded")
+                return
+    
+    def _cache_entry(self, model_name: str) -> str:
+        """Return the Hugging Face cache directory used for a model"""
+        return os.path.join(self.cache_dir, "models--" + model_name.replace("/", "--"))
+    
+    def prune_disk_cache(self) -> List[str]:
+        """Remove least recently used model downloads until the cache fits cache_max_mb"""
+        if not self.cache_max_mb or self.cache_max_mb <= 0 or not os.path.isdir(self.cache_dir):
+            return []
+        
+        with self._lock:
+            in_use = {self._cache_entry(name) for name in list(self._pipelines) + list(self._loading)}
+        
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            entries.append((os.path.getmtime(path), path, _dir_size(path)))
+        
+        limit = self.cache_max_mb * 1024 * 1024
+        total = sum(size for _, _, size in entries)
+        removed = []
+        for _, path, size in sorted(entries):
+            if total <= limit:
+                break
+            if path in in_use:
+                continue
+            logger.info(f"Pruning model cache entry {path} ({size / (1024 * 1024):.0f}MB)")
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed.append(path)
+        
+        if total > limit:
+            logger.warning(f"Model cache is {total / (1024 * 1024):.0f}MB, above the "
+                           f"{self.cache_max_mb:.0f}MB cap, but remaining entries are in use")
+        return removed
+
+# Profiling defaults
+DEFAULT_PROFILE_RATE = 0.1  # Fraction of requests profiled while profiling is enabled
+DEFAULT_PROFILE_INTERVAL = 0.005  # Seconds between stack samples
+MIN_PROFILE_INTERVAL = 0.001  # Shorter intervals turn the sampler into a busy loop
+DEFAULT_PROFILE_MAX_FILES = 200  # Oldest profile files are removed beyond this
+
+class GenerationProfiler:
+    """Opt-in sampling profiler for the generation hot path
+    
+    While enabled, a sample_rate fraction of profiled calls get a background
+    thread that samples the calling thread's stack every interval seconds, and
+    optionally a torch operator profile. Threads that do work on the caller's
+    behalf (such as continuous batching schedulers) can be sampled as well. Each profiled call writes a
+    flamegraph-compatible folded stack file and a per-op summary to output_dir,
+    keeping at most max_files files. Only one call is profiled at a time.
+    When disabled, profile() costs a single attribute check.
+    """
+    
+    def __init__(self, output_dir: str, enabled: bool = False,
+                 sample_rate: float = DEFAULT_PROFILE_RATE,
+                 interval: float = DEFAULT_PROFILE_INTERVAL,
+                 torch_ops: bool = True,
+                 max_files: int = DEFAULT_PROFILE_MAX_FILES):
+        """Configure the profiler; it stays idle until enabled"""
+        self.output_dir = output_dir
+        self.enabled = False
+        self.sample_rate = DEFAULT_PROFILE_RATE
+        self.interval = DEFAULT_PROFILE_INTERVAL
+        self.torch_ops = True
+        self.max_files = max_files
+        self.profiled_count = 0
+        
+        # Separate RNG so sampling decisions never disturb generation randomness
+        self._rng = random.Random()
+        # Bounds the profiler to one sampling thread and one torch.profiler
+        # session, which cannot run concurrently anyway
+        self._profile_lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        
+        self.configure(enabled=enabled, sample_rate=sample_rate,
+                       interval=interval, torch_ops=torch_ops)
+    
+    def configure(self, enabled: Optional[bool] = None, sample_rate: Optional[float] = None,
+                  interval: Optional[float] = None, torch_ops: Optional[bool] = None) -> Dict[str, Any]:
+        """Update settings at runtime and return the resulting configuration"""
+        for name, value in (("enabled", enabled), ("torchOps", torch_ops)):
+            if value is not None and not isinstance(value, bool):
+                raise ValueError(f"{name} must be a boolean")
+        for name, value in (("sampleRate", sample_rate), ("interval", interval)):
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise ValueError(f"{name} must be a number")
+        if sample_rate is not None and not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sampleRate must be between 0 and 1")
+        if interval is not None and interval < MIN_PROFILE_INTERVAL:
+            raise ValueError(f"interval must be at least {MIN_PROFILE_INTERVAL}")
+        
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if interval is not None:
+            self.interval = interval
+        if torch_ops is not None:
+            self.torch_ops = torch_ops
+        if enabled is not None:
+            self.enabled = enabled
+            logger.info(f"Profiling {'enabled' if enabled else 'disabled'} "
+                        f"(sample rate {self.sample_rate}, interval {self.interval}s)")
+        return self.status()
+    
+    def status(self) -> Dict[str, Any]:
+        """Describe the current profiler configuration"""
+        return {
+            "enabled": self.enabled,
+            "sampleRate": self.sample_rate,
+            "interval": self.interval,
+            "torchOps": self.torch_ops,
+            "outputDir": self.output_dir,
+            "profiledCount": self.profiled_count
+        }
+    
+    @contextmanager
+    def profile(self, label: str, threads: Optional[Callable[[], Dict[int, str]]] = None):
+        """Profile the enclosed block if profiling is enabled and this call is sampled
+        
+        threads, if given, returns the ids and names of other threads to sample
+        along with the caller. It is called on every sample, so threads started
+        during the block are picked up too.
+        """
+        if not self.enabled or self._rng.random() >= self.sample_rate:
+            yield
+            return
+        if not self._profile_lock.acquire(blocking=False):
+            # Another call is being profiled; run this one unprofiled
+            yield
+            return
+        try:
+            with self._profile_call(label, threads):
+                yield
+        finally:
+            self._profile_lock.release()
+    
+    @contextmanager
+    def _profile_call(self, label: str, threads: Optional[Callable[[], Dict[int, str]]]):
+        """Sample stacks and torch operators for the enclosed block"""
+        
+        stacks: Counter = Counter()
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample_stacks,
+            args=(threading.get_ident(), threads, stacks, stop),
+            daemon=True
+        )
+        
+        torch_profile = None
+        if self.torch_ops:
+            try:
+                activities = [torch.profiler.ProfilerActivity.CPU]
+                if torch.cuda.is_available():
+                    activities.append(torch.profiler.ProfilerActivity.CUDA)
+                options = {}
+                if threads is not None:
+                    try:
+                        # Operators run on the extra threads are only recorded with this option
+                        options['experimental_config'] = torch._C._profiler._ExperimentalConfig(
+                            profile_all_threads=True)
+                    except (AttributeError, TypeError):
+                        logger.warning("This torch version records operator timings "
+                                       "for the calling thread only")
+                torch_profile = torch.profiler.profile(activities=activities, **options)
+                torch_profile.__enter__()
+            except Exception as e:
+                logger.warning(f"Could not start torch profiler: {e}")
+                torch_profile = None
+        
+        start_time = time.perf_counter()
+        sampler.start()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            stop.set()
+            sampler.join()
+            
+            op_summary = None
+            if torch_profile is not None:
+                try:
+                    torch_profile.__exit__(None, None, None)
+                    op_summary = torch_profile.key_averages().table(
+                        sort_by="self_cpu_time_total", row_limit=50)
+                except Exception as e:
+                    logger.warning(f"Could not collect torch operator timings: {e}")
+            
+            self._write(label, elapsed, stacks, op_summary)
+    
+    def _sample_stacks(self, thread_id: int, threads: Optional[Callable[[], Dict[int, str]]],
+                       stacks: Counter, stop: threading.Event):
+        """Record folded stacks of the target threads until stop is set
+        
+        Stacks of the extra threads are rooted at a frame named after the
+        thread so they stay separate from the caller's in a flamegraph.
+        """
+        while not stop.wait(self.interval):
+            frames = sys._current_frames()
+            targets = {thread_id: None}
+            if threads is not None:
+                targets.update(threads())
+            
+            for target, thread_name in targets.items():
+                frame = frames.get(target)
+                if frame is None:
+                    continue
+                
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    name = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    names.append(name.replace(';', ':'))
+                    frame = frame.f_back
+                if thread_name:
+                    names.append(f"[{thread_name}]".replace(';', ':'))
+                stacks[';'.join(reversed(names))] += 1
     
-    def generate(self, prompt: str, max_length: int = 150) -> str:
-        """Generate text based on the prompt"""
-        if not self.generator:
-            self._initialize_generator()
+    def _write(self, label: str, elapsed: float, stacks: Counter, op_summary: Optional[str]):
+        """Write folded stacks and the operator summary for one profiled call"""
+        with self._count_lock:
+            self.profiled_count += 1
+            sequence = self.profiled_count
+        
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            base = os.path.join(
+                self.output_dir,
+                f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{sequence}-{label}"
+            )
+            
+            with open(base + ".folded", 'w') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            
+            if op_summary:
+                with open(base + ".ops.txt", 'w') as f:
+                    f.write(op_summary)
+            
+            logger.info(f"Profiled {label} in {elapsed:.2f}s "
+                        f"({sum(stacks.values())} stack samples): {base}.*")
+            self._rotate()
+        except OSError as e:
+            logger.error(f"Error writing profile output: {e}")
+    
+    def _rotate(self):
+        """Remove the oldest profile files beyond max_files"""
+        files = [os.path.join(self.output_dir, name) for name in os.listdir(self.output_dir)
+                 if name.endswith(('.folded', '.ops.txt'))]
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+class IcebreakerGenerator:
+    """Generate icebreakers using transformers models"""
+    
+    def __init__(self, model_name: str = DEFAULT_MODEL, extra_models: Optional[List[str]] = None,
+                 memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+                 cache_max_mb: float = DEFAULT_CACHE_MAX_MB,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 profiler: Optional[GenerationProfiler] = None,
+                 max_batch_size: int = 0):
+        """Initialize the generator with specified default model and optional extra models
+        
+        With max_batch_size > 0, generation goes through a continuous batching
+        decode loop per model instead of one pipeline call per request.
+        """
+        if not TRANSFORMERS_AVAILABLE:
+            raise ImportError("Transformers library not available")
+        
+        self.model_name = model_name
+        self.cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_cache")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        logger.info(f"Model cache directory: {self.cache_dir}")
+        
+        self.registry = ModelRegistry(
+            [model_name] + list(extra_models or []),
+            self.cache_dir,
+            memory_budget_mb=memory_budget_mb,
+            cache_max_mb=cache_max_mb,
+            idle_timeout=idle_timeout
+        )
+        self.profiler = profiler or GenerationProfiler(
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+        )
+        
+        # Seeding sets the global torch RNG, so seeded calls run one at a time to
+        # keep each other from consuming their random numbers. Unseeded calls skip
+        # the lock; with --no-payload-seed, a seeded request that overlaps them may
+        # not reproduce exactly.
+        self._sampling_lock = threading.Lock()
+        
+        self.max_batch_size = max_batch_size
+        self._batchers: Dict[str, "ContinuousBatcher"] = {}
+        self._batchers_lock = threading.Lock()
+        self.registry.on_unload = self._stop_batcher
+        
+        # Load the default model up front; extra models are loaded on first use
+        self._initialize_generator()
+    
+    def _initialize_generator(self, model_name: Optional[str] = None):
+        """Return the text generation pipeline for a model, loading it if needed"""
+        return self.registry.get(model_name)
+    
+    def _batcher_for(self, model_name: str, pipe) -> "ContinuousBatcher":
+        """Return the continuous batcher serving a loaded pipeline"""
+        from continuous_batching import ContinuousBatcher
+        
+        with self._batchers_lock:
+            batcher = self._batchers.get(model_name)
+            if batcher is None or batcher.pipe is not pipe or batcher.stopped:
+                if batcher is not None:
+                    batcher.stop()
+                logger.info(f"Starting continuous batching for {model_name} "
+                            f"(max batch size {self.max_batch_size})")
+                batcher = ContinuousBatcher(pipe, max_batch_size=self.max_batch_size)
+                self._batchers[model_name] = batcher
+            return batcher
+    
+    def _stop_batcher(self, model_name: str):
+        """Stop the batcher of an unloaded model so its pipeline can be freed"""
+        with self._batchers_lock:
+            batcher = self._batchers.pop(model_name, None)
+        if batcher is not None:
+            batcher.stop()
+            # The scheduler holds the model until it has drained its requests
+            # and exited; the registry measures RSS right after this returns
+            batcher.join()
+    
+    def batching_threads(self) -> Dict[int, str]:
+        """Return the ids and names of the running continuous batching schedulers"""
+        with self._batchers_lock:
+            return {batcher.thread_id: f"continuous-batcher {name}"
+                    for name, batcher in self._batchers.items()
+                    if batcher.thread_id is not None and not batcher.stopped}
+    
+    def batching_status(self) -> Dict[str, Any]:
+        """Describe the load on each model's continuous batcher"""
+        with self._batchers_lock:
+            return {name: batcher.stats() for name, batcher in self._batchers.items()}
+    
+    def generate(self, prompt: str, max_length: int = 150, model_name: Optional[str] = None,
+                 seed: Optional[int] = None) -> str:
+        """Generate text based on the prompt, reproducibly when a seed is given"""
+        generator = self._initialize_generator(model_name)
         
         logger.info("Generating text...")    
         try:
-            # Generate text
-            result = self.generator(
-                prompt, 
+            if self.max_batch_size > 0:
+                from continuous_batching import BatcherStopped
+                
+                # Each request samples with its own generator, so no global seeding or lock
+                for attempt in range(2):
+                    batcher = self._batcher_for(model_name or self.model_name, generator)
+                    try:
+                        generated_text = batcher.generate(
+                            prompt,
+                            max_new_tokens=max_length,
+                            temperature=0.7,
+                            top_p=0.9,
+                            seed=seed
+                        )
+                        break
+                    except BatcherStopped:
+                        # The model was unloaded or the batcher shut down; retry
+                        # once with a fresh batcher (reloading the model if needed)
+                        if attempt:
+                            raise
+                        generator = self._initialize_generator(model_name)
+                logger.info("Text generation complete")
+                return generated_text
+            
+            generate_kwargs = dict(
                 max_new_tokens=max_length,
                 temperature=0.7,
                 top_p=0.9,
@@ -112,6 +677,14 @@ class IcebreakerGenerator:
                 return_full_text=True
             )
             
+            # Generate text
+            if seed is None:
+                result = generator(prompt, **generate_kwargs)
+            else:
+                with self._sampling_lock:
+                    set_seed(seed)
+                    result = generator(prompt, **generate_kwargs)
+            
             generated_text = result[0]['generated_text']
             logger.info("Text generation complete")
             return generated_text
@@ -155,8 +728,20 @@ class IcebreakerGenerator:
             return fallback
     
     def generate_icebreakers(self, user_a: Dict, user_b: Dict, 
-                           meeting_date: str, location: str) -> Dict[str, Any]:
+                           meeting_date: str, location: str,
+                           model_name: Optional[str] = None,
+                           seed: Optional[int] = None) -> Dict[str, Any]:
         """Generate icebreakers for two users meeting"""
+        # With continuous batching the model runs on the scheduler threads, so
+        # sample those too; they also serve any other requests in the batch
+        threads = self.batching_threads if self.max_batch_size > 0 else None
+        with self.profiler.profile("icebreakers", threads):
+            return self._generate_icebreakers(user_a, user_b, meeting_date, location,
+                                              model_name, seed)
+    
+    def _generate_icebreakers(self, user_a: Dict, user_b: Dict, meeting_date: str, location: str,
+                              model_name: Optional[str], seed: Optional[int]) -> Dict[str, Any]:
+        """Build the prompt, run the model and structure its output"""
         # Construct the prompt
         prompt = f"""
 You are a friendly AI assistant helping two university students prepare for a coffee meetup. Your job is to generate icebreakers and conversation tips to help them feel at ease and find shared topics.
@@ -196,7 +781,7 @@ You are a friendly AI assistant helping two university students prepare for a co
         # Generate text with context-aware formatting for DistilGPT-2
         # Since DistilGPT-2 doesn't have the same context understanding as larger models,
         # we'll post-process the output to create the proper format
-        generated_text = self.generate(prompt)
+        generated_text = self.generate(prompt, model_name=model_name, seed=seed)
         
         # For DistilGPT-2, which may not follow the format perfectly, 
         # let's construct a more structured response
@@ -249,42 +834,102 @@ You are a friendly AI assistant helping two university students prepare for a co
         # Parse the structured response
         return self.parse_response(structured_response)
 
-def setup_flask_server(generator):
+def setup_flask_server(generator, admin_token: Optional[str] = None, payload_seeds: bool = True,
+                       result_store: Optional["ResultStore"] = None):
     """Set up a Flask server to serve the model"""
     try:
-        from flask import Flask, request, jsonify
+        from flask import Flask, request
         from flask_cors import CORS  # Import CORS for cross-origin requests
         
         app = Flask(__name__)
         CORS(app)  # Enable CORS for all routes
+        install_json_errors(app)
         
         # Add a health check endpoint
         @app.route('/health', methods=['GET'])
         def health_check():
-            return jsonify({"status": "healthy", "model": generator.model_name})
+            return json_response({
+                "status": "healthy",
+                "model": generator.model_name,
+                "models": generator.registry.status(),
+                "batching": generator.batching_status()
+            })
+        
+        @app.route('/admin/profiling', methods=['GET', 'POST'])
+        def profiling():
+            # Without a token, admin calls are only accepted from this machine
+            if admin_token:
+                if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+                    return json_response({"error": "Unauthorized"}, 401)
+            elif request.remote_addr not in ('127.0.0.1', '::1'):
+                return json_response({"error": "Admin endpoints are local-only without --admin-token"}, 403)
+            
+            if request.method == 'GET':
+                return json_response(generator.profiler.status())
+            
+            try:
+                body = request.get_data(cache=False)
+                data = loads(body) if body else {}
+                if not isinstance(data, dict):
+                    raise ValueError("Expected a JSON object")
+                status = generator.profiler.configure(
+                    enabled=data.get('enabled'),
+                    sample_rate=data.get('sampleRate'),
+                    interval=data.get('interval'),
+                    torch_ops=data.get('torchOps')
+                )
+            except (TypeError, ValueError) as e:
+                return json_response({"error": str(e)}, 400)
+            return json_response(status)
         
         @app.route('/api/icebreakers', methods=['POST', 'HEAD'])
         def generate_icebreakers():
             # Handle HEAD request for availability check
             if request.method == 'HEAD':
                 return '', 200
+            
+            # Validate everything before any prompt construction or tokenization
+            payload = IcebreakerRequest.from_json(request.get_data(cache=False))
+            
+            # Resolve the default so seeds and cache keys do not depend on whether it was named
+            model_name = payload.model or generator.model_name
+            if not generator.registry.has(model_name):
+                return json_response({
+                    "error": f"Unknown model: {model_name}",
+                    "available": generator.registry.model_names
+                }, 400)
                 
             try:
-                data = request.json
-                if not data:
-                    return jsonify({"error": "No data provided"}), 400
-                    
-                user_a = data.get('userA', {})
-                user_b = data.get('userB', {})
-                meeting_date = data.get('meetingDate', 'Upcoming')
-                location = data.get('location', 'Campus')
+                user_a = payload.user_a.to_dict()
+                user_b = payload.user_b.to_dict()
+                meeting_date = payload.meeting_date or 'Upcoming'
+                location = payload.location or 'Campus'
+                
+                # An explicit seed wins; otherwise identical payloads share a seed
+                seed = payload.seed
+                if seed is None and payload_seeds:
+                    seed = payload.payload_seed(model_name)
+                
+                # Seeded results are reproducible, so any worker's result can be reused
+                cache_key = None
+                if result_store is not None and seed is not None:
+                    cache_key = payload.cache_key(model_name, seed)
+                    cached = result_store.get(cache_key)
+                    if cached is not None:
+                        return json_response(cached, headers={"X-Cache": "HIT"})
                 
                 logger.info(f"Generating icebreakers for {user_a.get('name')} and {user_b.get('name')}")
-                result = generator.generate_icebreakers(user_a, user_b, meeting_date, location)
-                return jsonify(result)
+                result = generator.generate_icebreakers(user_a, user_b, meeting_date, location,
+                                                        model_name=model_name, seed=seed)
+                result["seed"] = seed
+                
+                if cache_key is not None:
+                    result_store.put(cache_key, result)
+                    return json_response(result, headers={"X-Cache": "MISS"})
+                return json_response(result)
             except Exception as e:
                 logger.error(f"Error generating icebreakers: {e}")
-                return jsonify({"error": str(e)}), 500
+                return json_response({"error": str(e)}, 500)
         
         return app
     except ImportError as e:
@@ -296,11 +941,45 @@ def main():
     """Main function to run the generator"""
     parser = argparse.ArgumentParser(description='Generate icebreakers using transformers')
     parser.add_argument('--serve', action='store_true', help='Run as a Flask API server')
-    parser.add_argument('--model', type=str, default=DEFAULT_MODEL, help='Model to use')
+    parser.add_argument('--model', type=str, default=DEFAULT_MODEL, help='Default model to use')
+    parser.add_argument('--extra-models', type=str, default='',
+                        help='Comma-separated additional models selectable per request')
+    parser.add_argument('--memory-budget-mb', type=float, default=DEFAULT_MEMORY_BUDGET_MB,
+                        help='Unload least recently used models above this RSS (0 = no limit)')
+    parser.add_argument('--cache-max-mb', type=float, default=DEFAULT_CACHE_MAX_MB,
+                        help='Prune model_cache to this size (0 = no limit)')
+    parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help='Unload models unused for this many seconds (0 = never)')
     parser.add_argument('--port', type=int, default=5000, help='Port to run the server on')
     parser.add_argument('--debug', action='store_true', help='Run in debug mode')
+    parser.add_argument('--profile', action='store_true',
+                        help='Start with profiling enabled (toggle at runtime via /admin/profiling)')
+    parser.add_argument('--profile-rate', type=float, default=DEFAULT_PROFILE_RATE,
+                        help='Fraction of requests to profile while profiling is enabled')
+    parser.add_argument('--profile-max-files', type=int, default=DEFAULT_PROFILE_MAX_FILES,
+                        help='Profile files kept before the oldest are removed')
+    parser.add_argument('--profile-dir', type=str,
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"),
+                        help='Directory for folded stacks and operator summaries')
+    parser.add_argument('--continuous-batching', type=int, default=0, metavar='MAX_BATCH_SIZE',
+                        help='Decode with iteration-level batching of up to this many requests (0 = off)')
+    parser.add_argument('--no-payload-seed', action='store_true',
+                        help='Sample unseeded unless a request supplies its own seed')
+    parser.add_argument('--result-store', type=str,
+                        help='Memory-mapped file for results shared between server processes')
+    parser.add_argument('--result-store-socket', type=str,
+                        help='Unix socket of a result store started with result_store.py --serve')
+    parser.add_argument('--result-store-slots', type=int,
+                        help='Number of slots when creating a --result-store file (default 4096)')
+    parser.add_argument('--result-store-slot-size', type=int,
+                        help='Bytes per slot when creating a --result-store file (default 4096)')
+    parser.add_argument('--admin-token', type=str, default=os.environ.get('ICEBREAKER_ADMIN_TOKEN'),
+                        help='Token required in X-Admin-Token for admin endpoints')
     args = parser.parse_args()
     
+    if args.result_store and args.result_store_socket:
+        parser.error("--result-store and --result-store-socket are mutually exclusive")
+    
     if args.debug:
         logger.setLevel(logging.DEBUG)
         logger.debug("Debug mode enabled")
@@ -311,11 +990,40 @@ def main():
     
     try:
         # Initialize the generator
-        generator = IcebreakerGenerator(model_name=args.model)
+        extra_models = [m.strip() for m in args.extra_models.split(',') if m.strip()]
+        generator = IcebreakerGenerator(
+            model_name=args.model,
+            extra_models=extra_models,
+            memory_budget_mb=args.memory_budget_mb,
+            cache_max_mb=args.cache_max_mb,
+            idle_timeout=args.idle_timeout,
+            profiler=GenerationProfiler(
+                args.profile_dir,
+                enabled=args.profile,
+                sample_rate=args.profile_rate,
+                max_files=args.profile_max_files
+            ),
+            max_batch_size=args.continuous_batching
+        )
         
         if args.serve:
             # Run as a Flask server
-            app = setup_flask_server(generator)
+            result_store = None
+            if args.result_store:
+                from result_store import MmapResultStore
+                options = {}
+                if args.result_store_slots is not None:
+                    options['slots'] = args.result_store_slots
+                if args.result_store_slot_size is not None:
+                    options['slot_size'] = args.result_store_slot_size
+                result_store = MmapResultStore(args.result_store, **options)
+            elif args.result_store_socket:
+                from result_store import SocketResultStore
+                result_store = SocketResultStore(args.result_store_socket)
+            
+            app = setup_flask_server(generator, admin_token=args.admin_token,
+                                     payload_seeds=not args.no_payload_seed,
+                                     result_store=result_store)
             logger.info(f"Starting Flask server on port {args.port}...")
             app.run(host='0.0.0.0', port=args.port, debug=args.debug)
         else: